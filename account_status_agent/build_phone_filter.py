@@ -0,0 +1,110 @@
+"""
+Offline build step: compiles the phone numbers of the applications table into a Bloom
+filter, so the account status service can answer unknown numbers without a DynamoDB read.
+
+Reads either a DynamoDB export to S3 in DynamoDB JSON format (the downloaded
+data/*.json.gz files, or a directory holding them) or scans the table directly, and
+writes a filter that eazybank_common.phone loads from PHONE_FILTER_PATH (a path in the
+layer, or an s3:// URL the function re-reads every PHONE_FILTER_REFRESH_SECONDS):
+
+    python account_status_agent/build_phone_filter.py --export ./export/data --fp-rate 0.001
+    python account_status_agent/build_phone_filter.py --scan --output s3://bucket/phone_filter.bin
+
+Rebuild whenever applications are added (e.g. on a schedule shorter than
+PHONE_FILTER_MAX_AGE_SECONDS): numbers added after the build are reported as not found.
+--headroom sizes the filter for growth so the false-positive rate holds until then.
+"""
+import argparse
+import glob
+import gzip
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from eazybank_common import bootstrap, payload, phone  # noqa: E402
+from eazybank_common.bloom import BloomFilter  # noqa: E402
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_TABLE = 'eazybank-applications'
+DEFAULT_OUTPUT = os.path.join(HERE, '..', 'eazybank_common', 'data', 'phone_filter.bin')
+
+
+def export_numbers(path):
+    """Yields the phone_no of every item in a DynamoDB JSON export (file or directory)."""
+    files = sorted(glob.glob(os.path.join(path, '**', '*.json*'), recursive=True)) if os.path.isdir(path) else [path]
+    for file_name in files:
+        opener = gzip.open if file_name.endswith('.gz') else open
+        with opener(file_name, 'rt', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                attribute = json.loads(line).get('Item', {}).get('phone_no')
+                if attribute:
+                    yield attribute.get('N') or attribute.get('S')
+
+
+def scan_numbers(table_name):
+    """Yields the phone_no of every item in the table (a paginated Scan of the key only)."""
+    paginator = bootstrap.get_client('dynamodb').get_paginator('scan')
+    for page in paginator.paginate(TableName=table_name, ProjectionExpression='phone_no'):
+        for item in page.get('Items', []):
+            attribute = item['phone_no']
+            yield attribute.get('N') or attribute.get('S')
+
+
+def build(numbers, fp_rate, headroom):
+    valid = set()
+    skipped = 0
+    for number in numbers:
+        try:
+            valid.add(phone.normalize(number))
+        except phone.InvalidPhoneNumber:
+            # The service rejects these numbers before it consults the filter
+            skipped += 1
+    bloom_filter = BloomFilter.for_capacity(int(len(valid) * headroom), fp_rate)
+    for number in valid:
+        bloom_filter.add(number)
+    return bloom_filter, skipped
+
+
+def write(output, blob):
+    if output.startswith('s3://'):
+        bucket, _, key = output[len('s3://'):].partition('/')
+        payload.S3Store(bucket).put(key, blob)
+    else:
+        with open(output, 'wb') as f:
+            f.write(blob)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--export', help='DynamoDB JSON export file or directory')
+    source.add_argument('--scan', action='store_true', help='scan the table instead of reading an export')
+    parser.add_argument('--table', default=DEFAULT_TABLE)
+    parser.add_argument('--fp-rate', type=float, default=0.001, help='target false-positive rate')
+    parser.add_argument('--headroom', type=float, default=1.2,
+                        help='capacity as a multiple of the current number count, for growth between builds')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='output path or s3:// URL')
+    args = parser.parse_args()
+
+    numbers = scan_numbers(args.table) if args.scan else export_numbers(args.export)
+    bloom_filter, skipped = build(numbers, args.fp_rate, max(1.0, args.headroom))
+    if not len(bloom_filter):
+        raise SystemExit('No phone numbers found')
+
+    blob = bloom_filter.to_bytes()
+    write(args.output, blob)
+    print(
+        f'Wrote {len(bloom_filter)} numbers ({len(blob)} bytes, {bloom_filter.num_hashes} hashes, '
+        f'expected false-positive rate {bloom_filter.expected_fp_rate():.5f}) to {args.output}'
+    )
+    if skipped:
+        print(f'Skipped {skipped} numbers that are not valid phone numbers')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,289 @@
 import json
-import boto3
+import os
+import random
+import time
+from collections import OrderedDict
 
-client = boto3.client('dynamodb')
+from eazybank_common import bootstrap, envelope, phone, rejection_reasons
+from eazybank_common.dynamodb import Projection, json_default
+from eazybank_common.instrumentation import add_count, get_logger, instrument_handler, log_payload, timed
+from eazybank_common.session_digest import SessionDigest
 
+logger = get_logger(__name__)
+
+TABLE_NAME = 'eazybank-applications'
+BATCH_API_PATH = '/getuserdetails/batch'
+WITH_REASON_API_PATH = '/getuserdetailswithreason'
+
+# Only the attributes the account status agent reads. The OpenAPI schema declares them all
+# as strings, so phone_no and account_balance keep DynamoDB's number strings.
+USER_DETAILS = Projection(
+    'phone_no',
+    'user_name',
+    'account_status',
+    'reason',
+    'account_number',
+    'account_balance',
+    'credit_card_number',
+    numbers_as_strings=True
+)
+
+# The only fields a lookup may keep in the session digest. Session attributes are passed to
+# every action group Lambda of the session, so records with account or card details are
+# not stored there; they are fetched again (usually from the container cache).
+DIGEST_FIELDS = frozenset(('phone_no', 'user_name', 'account_status', 'reason'))
+
+# BatchGetItem settings
+BATCH_GET_MAX_KEYS = 100  # DynamoDB limit per BatchGetItem request
+BATCH_GET_MAX_RETRIES = int(os.environ.get('BATCH_GET_MAX_RETRIES', '5'))
+BATCH_GET_BASE_DELAY_SECONDS = float(os.environ.get('BATCH_GET_BASE_DELAY_SECONDS', '0.05'))
+
+# Read-through cache settings (per Lambda container)
+CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', '1024'))
+CACHE_TTL_SECONDS = float(os.environ.get('CACHE_TTL_SECONDS', '60'))
+CACHE_NEGATIVE_TTL_SECONDS = float(os.environ.get('CACHE_NEGATIVE_TTL_SECONDS', '10'))
+
+
+class TTLCache:
+    """
+    Small in-process LRU cache with per-entry expiry.
+
+    Entries live in the Lambda container between invocations, so repeated
+    lookups for the same phone number within a conversation skip DynamoDB.
+    A value of None is cached as a negative ("User not found") result.
+    """
+
+    def __init__(self, max_entries, ttl, negative_ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Returns (found, value). Expired entries count as a miss."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, value
+            del self._entries[key]
+        self.misses += 1
+        return False, None
+
+    def put(self, key, value):
+        """Stores a value; returns the number of least recently used entries evicted for it."""
+        if self.max_entries <= 0:
+            return 0
+        ttl = self.negative_ttl if value is None else self.ttl
+        if ttl <= 0:
+            return 0
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        evicted = 0
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            evicted += 1
+        self.evictions += evicted
+        return evicted
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self._entries)
+        }
+
+
+cache = TTLCache(CACHE_MAX_ENTRIES, CACHE_TTL_SECONDS, CACHE_NEGATIVE_TTL_SECONDS)
+
+
+def get_user_details(phone_no):
+    """
+    Returns the user details for a (normalized) phone number, or None if no application
+    exists. Results (including misses) are served from the container cache while fresh,
+    and numbers the phone filter rules out are answered without a DynamoDB read.
+    """
+    found, user_details = cache.get(phone_no)
+    if found:
+        add_count('CacheHits')
+        return user_details
+    add_count('CacheMisses')
+
+    if not phone.might_exist(phone_no):
+        add_count('FilterMisses')
+        return None
+
+    # Create a request syntax to retrieve data from the DynamoDB Table using GET Item method
+    with timed('DynamoDB'):
+        response = bootstrap.get_client('dynamodb').get_item(
+            TableName=TABLE_NAME,
+            Key={'phone_no': {'N': phone_no}},
+            **USER_DETAILS.read_kwargs()
+        )
+
+    user_details = None
+    if 'Item' in response:
+        # Convert DynamoDB's format to a more readable JSON format
+        user_details = USER_DETAILS(response['Item'])
+
+    evicted = cache.put(phone_no, user_details)
+    if evicted:
+        add_count('CacheEvictions', evicted)
+    return user_details
+
+
+def get_user_details_batch(phone_nos):
+    """
+    Returns a dict of phone number -> user details (or None) for many numbers.
+
+    Cached numbers are answered locally and numbers the phone filter rules out are not
+    found; the rest are fetched with BatchGetItem in chunks of 100 keys. UnprocessedKeys
+    are retried with exponential backoff and jitter.
+    """
+    results = {}
+    pending = []
+    for phone_no in phone_nos:
+        found, user_details = cache.get(phone_no)
+        if found:
+            results[phone_no] = user_details
+        else:
+            pending.append(phone_no)
+    add_count('CacheHits', len(phone_nos) - len(pending))
+    add_count('CacheMisses', len(pending))
+
+    candidates = [phone_no for phone_no in pending if phone.might_exist(phone_no)]
+    add_count('FilterMisses', len(pending) - len(candidates))
+    for phone_no in pending:
+        results.setdefault(phone_no, None)
+    pending = candidates
+
+    evicted = 0
+    for start in range(0, len(pending), BATCH_GET_MAX_KEYS):
+        chunk = pending[start:start + BATCH_GET_MAX_KEYS]
+        keys = [{'phone_no': {'N': phone_no}} for phone_no in chunk]
+        request_items = {TABLE_NAME: {'Keys': keys, **USER_DETAILS.read_kwargs()}}
+
+        attempt = 0
+        while request_items:
+            with timed('DynamoDB'):
+                response = bootstrap.get_client('dynamodb').batch_get_item(RequestItems=request_items)
+            for item in response.get('Responses', {}).get(TABLE_NAME, []):
+                results[item['phone_no']['N']] = USER_DETAILS(item)
+
+            request_items = response.get('UnprocessedKeys') or {}
+            if request_items:
+                attempt += 1
+                if attempt > BATCH_GET_MAX_RETRIES:
+                    unprocessed = len(request_items[TABLE_NAME]['Keys'])
+                    raise RuntimeError(f'{unprocessed} keys still unprocessed after {BATCH_GET_MAX_RETRIES} retries')
+                delay = BATCH_GET_BASE_DELAY_SECONDS * (2 ** (attempt - 1))
+                time.sleep(random.uniform(0, delay))
+
+        # Anything not returned by DynamoDB does not exist
+        for phone_no in chunk:
+            user_details = results.setdefault(phone_no, None)
+            evicted += cache.put(phone_no, user_details)
+    if evicted:
+        add_count('CacheEvictions', evicted)
+
+    return results
+
+
+def get_phone_numbers(event):
+    """
+    Collects the phone numbers of a batch request, in order and without duplicates.
+
+    Numbers may arrive as repeated 'phone_no' parameters, as a 'phone_nos' parameter, or as a
+    'phone_nos' property in the request body. Bedrock passes arrays as strings such as
+    "[2016166576, 2016166577]": JSON arrays are parsed, other values are split on commas
+    only, since formatted numbers ("+1 201 616 6576") contain spaces.
+    """
+    values = []
+    for param in event.get('parameters') or []:
+        if param.get('name') in ('phone_no', 'phone_nos'):
+            values.append(param.get('value'))
+
+    properties = (event.get('requestBody') or {}).get('content', {}).get('application/json', {}).get('properties', [])
+    for prop in properties:
+        if prop.get('name') in ('phone_no', 'phone_nos'):
+            values.append(prop.get('value'))
+
+    phone_nos = []
+    seen = set()
+    for value in values:
+        if isinstance(value, str):
+            try:
+                value = json.loads(value)
+            except ValueError:
+                pass
+        if isinstance(value, list):
+            tokens = [str(v) for v in value]
+        else:
+            tokens = str(value if value is not None else '').strip().strip('[]').split(',')
+        for token in tokens:
+            token = token.strip().strip('"\'').strip()
+            if token and token not in seen:
+                seen.add(token)
+                phone_nos.append(token)
+
+    if not phone_nos:
+        raise KeyError('phone_nos')
+    return phone_nos
+
+
+def add_rejection_detail(user_details):
+    """
+    Returns a copy of the user details with the expanded explanation of the stored
+    rejection reason, looked up in the precompiled ErrorCode index.
+    """
+    details = dict(user_details)
+    details['rejection_detail'] = None
+    if str(details.get('account_status', '')).lower() == 'rejected':
+        with timed('RejectionLookup'):
+            match = rejection_reasons.find(details.get('reason'))
+        if match is not None:
+            error_code, explanation = match
+            details['rejection_detail'] = {'error_code': error_code, 'explanation': explanation}
+    return details
+
+
+def build_response(event, response_body, session_updates=None, digest=None):
+    """
+    Wraps a response body in the envelope expected by the Bedrock Agent.
+    session_updates are added to both the session and prompt session attributes;
+    the digest is only stored in the session attributes.
+    """
+    session_attributes = event.get('sessionAttributes', {})
+    prompt_session_attributes = event.get('promptSessionAttributes', {})
+    if session_updates:
+        session_attributes = {**session_attributes, **session_updates}
+        prompt_session_attributes = {**prompt_session_attributes, **session_updates}
+    if digest is not None:
+        session_attributes = digest.apply(session_attributes)
+    return envelope.response(event, response_body, session_attributes=session_attributes,
+                             prompt_session_attributes=prompt_session_attributes)
+
+
+@instrument_handler('account_status')
 def lambda_handler(event, context):
     """
     Fetches user details from DynamoDB based on the phone number.
 
+    Requests to /getuserdetails/batch look up many phone numbers at once and return one
+    result per number. Requests to /getuserdetailswithreason also return the detailed
+    explanation of a rejection, so the supervisor can answer "why was I rejected?"
+    without another agent hop.
+
+    Single lookups without account details (not found, rejected, in progress) are
+    remembered in the session digest, so a repeated question later in the same session
+    is answered from the session attributes without a backend call.
+
     Args:
         event (dict): Event data passed to the Lambda function.  This is expected to contain the phone number in the 'parameters' section.
         context (object): Lambda context object.
@@ -16,61 +293,77 @@ def lambda_handler(event, context):
     """
 
     try:
-        phone_no = event['parameters'][0]['value']
+        if event.get('apiPath') == BATCH_API_PATH:
+            with timed('Parse'):
+                requested = []  # (as given, normalized or None if invalid)
+                for value in get_phone_numbers(event):
+                    try:
+                        requested.append((value, phone.normalize(value)))
+                    except phone.InvalidPhoneNumber:
+                        requested.append((value, None))
+                phone_nos = list(dict.fromkeys(phone_no for _, phone_no in requested if phone_no is not None))
+            found_details = get_user_details_batch(phone_nos)
+            logger.debug("Cache stats: %s", cache.stats())
 
-        # Create a request syntax to retrieve data from the DynamoDB Table using GET Item method
-        response = client.get_item(
-            TableName='eazybank-applications', 
-            Key={'phone_no': {'N': phone_no}}
-        )
+            results = []
+            for value, phone_no in requested:
+                user_details = found_details.get(phone_no)
+                if phone_no is None:
+                    results.append({'phone_no': value, 'found': False, 'message': 'Invalid phone number'})
+                elif user_details is not None:
+                    results.append({'phone_no': phone_no, 'found': True, 'user_details': user_details})
+                else:
+                    results.append({'phone_no': phone_no, 'found': False, 'message': 'User not found'})
 
-        if 'Item' in response:
-            # Convert DynamoDB's format to a more readable JSON format
-            item = response['Item']
-            user_details = {}
-            for key, value in item.items():
-                user_details[key] = list(value.values())[0]
-            print(user_details)
-
-            response_body = {
-                'application/json': {
-                    'body': json.dumps(user_details)
-                }
-            }
+            with timed('Serialize'):
+                body = json.dumps({'results': results}, default=json_default)
+            add_count('ResponseBytes', len(body), unit='Bytes')
+
+            return build_response(event, body)
+
+        phone_no = phone.normalize(event['parameters'][0]['value'])
+
+        digest = SessionDigest.load(event.get('sessionAttributes'))
+        found, user_details = digest.get_lookup(phone_no)
+        if found:
+            add_count('DigestHits')
         else:
-            response_body = {
-                'application/json': {
-                    'body': json.dumps({'message': 'User not found'})
+            user_details = get_user_details(phone_no)
+            logger.debug("Cache stats: %s", cache.stats())
+            if user_details is None or DIGEST_FIELDS.issuperset(user_details):
+                digest.put_lookup(phone_no, user_details)
+
+        session_updates = None
+        if user_details is not None and event.get('apiPath') == WITH_REASON_API_PATH:
+            user_details = add_rejection_detail(user_details)
+            if user_details['rejection_detail'] is not None:
+                session_updates = {
+                    'rejection_error_code': user_details['rejection_detail']['error_code'],
+                    'rejection_explanation': user_details['rejection_detail']['explanation']
                 }
-            }
-            
-        action_response = {
-            'actionGroup': event['actionGroup'],
-            'apiPath': event['apiPath'],
-            'httpMethod': event['httpMethod'],
-            'httpStatusCode': 200,
-            'responseBody': response_body
-        }
-        session_attributes = event.get('sessionAttributes', {})
-        prompt_session_attributes = event.get('promptSessionAttributes', {})
-        api_response = {
-            'messageVersion': '1.0',
-            'response': action_response,
-            'sessionAttributes': session_attributes,
-            'promptSessionAttributes': prompt_session_attributes
-        }
 
-        return api_response
+        with timed('Serialize'):
+            if user_details is not None:
+                log_payload(logger, "User details", user_details)
+                body = json.dumps(user_details, default=json_default)
+            else:
+                body = json.dumps({'message': 'User not found'})
+        add_count('ResponseBytes', len(body), unit='Bytes')
+
+        return build_response(event, body, session_updates, digest)
 
     except KeyError as e:
-        print(f"Missing key in event: {e}")
-        return {
-            'statusCode': 400,
-            'body': json.dumps({'message': f'Missing required parameter: {e}'})
-        }
+        logger.warning("Missing key in event: %s", e)
+        return envelope.error(event, 400, f'Missing required parameter: {e}')
+    except phone.InvalidPhoneNumber as e:
+        logger.info("%s", e)
+        add_count('InvalidPhoneNumbers')
+        return envelope.error(event, 400, str(e))
     except Exception as e:
-        print(f"Error getting data from DynamoDB: {e}")
-        return {
-            'statusCode': 500,
-            'body': json.dumps({'message': f'Error retrieving user details: {e}'})
-        }
+        logger.error("Error getting data from DynamoDB: %s", e)
+        return envelope.error(event, 500, f'Error retrieving user details: {e}')
+
+
+bootstrap.register_priming_hook(lambda: bootstrap.get_client('dynamodb'))
+bootstrap.register_priming_hook(phone.get_filter)
+bootstrap.prime_on_init()
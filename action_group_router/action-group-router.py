@@ -0,0 +1,92 @@
+import importlib.util
+import os
+
+from eazybank_common import bootstrap, envelope
+from eazybank_common.instrumentation import add_count, get_logger, instrument_handler, set_property
+
+logger = get_logger(__name__)
+
+# Directory the handler files below are relative to. Package the router with the same
+# layout, e.g. action_group_router/, account_status_agent/, ... in one deployment zip.
+HANDLER_ROOT = os.environ.get(
+    'ROUTER_HANDLER_ROOT',
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+)
+# Load every handler during init (so one warm container serves all action groups)
+# instead of on the first request for it.
+PRELOAD = os.environ.get('ROUTER_PRELOAD', 'true').lower() == 'true'
+
+HANDLER_FILES = {
+    'account_status': 'account_status_agent/new-account-status-svc.py',
+    'rejection_reason': 'rejection_reason_agent/rejection-reason-lookup-svc.py',
+    'publish_to_sqs': 'human_handoff_agent/publish-to-sqs-svc.py',
+}
+
+# (action group, API path) -> handler name. An action group of None matches any action
+# group; more specific routes can be added for action groups that reuse a path.
+ROUTES = {
+    (None, '/getuserdetails'): 'account_status',
+    (None, '/getuserdetails/batch'): 'account_status',
+    (None, '/getuserdetailswithreason'): 'account_status',
+    (None, '/getrejectionreason'): 'rejection_reason',
+    (None, '/store_conversation_data'): 'publish_to_sqs',
+}
+
+# ROUTER_HANDLERS limits the router to some handlers, e.g. "account_status,rejection_reason"
+ENABLED_HANDLERS = set(filter(None, os.environ.get('ROUTER_HANDLERS', ','.join(HANDLER_FILES)).split(',')))
+
+_handlers = {}
+
+
+def load_handler(name):
+    """
+    Imports a handler file (the file names are not valid module names) and returns its
+    lambda_handler without the @instrument_handler wrapper: the router's own wrapper is
+    the single instrumentation layer, so every call writes one EMF line. The module's
+    prime_on_init() is deferred to the router's.
+    """
+    handler = _handlers.get(name)
+    if handler is None:
+        path = os.path.join(HANDLER_ROOT, HANDLER_FILES[name])
+        spec = importlib.util.spec_from_file_location(f'routed_{name}', path)
+        module = importlib.util.module_from_spec(spec)
+        with bootstrap.deferred_priming():
+            spec.loader.exec_module(module)
+        handler = _handlers[name] = getattr(module.lambda_handler, '__wrapped__', module.lambda_handler)
+    return handler
+
+
+def resolve(event):
+    """Returns the name of the handler for an event, or None."""
+    api_path = event.get('apiPath')
+    name = ROUTES.get((event.get('actionGroup'), api_path)) or ROUTES.get((None, api_path))
+    return name if name in ENABLED_HANDLERS else None
+
+
+@instrument_handler('action_router')
+def lambda_handler(event, context):
+    """
+    Single entry point for the action groups: dispatches on actionGroup + apiPath to the
+    registered handler and returns its response unchanged.
+
+    Unknown routes and handler failures are answered with an error envelope the agent
+    can parse, instead of failing the invocation.
+    """
+    name = resolve(event)
+    if name is None:
+        add_count('RouteMisses')
+        logger.warning("No handler for action group %s, API path %s", event.get('actionGroup'), event.get('apiPath'))
+        return envelope.error(event, 404, f"No handler for {event.get('apiPath')}")
+
+    set_property('Route', name)
+    try:
+        return load_handler(name)(event, context)
+    except Exception as e:
+        logger.error("Handler %s failed: %s", name, e)
+        return envelope.error(event, 500, f'Error processing request: {e}')
+
+
+if PRELOAD:
+    for _name in sorted(ENABLED_HANDLERS & set(HANDLER_FILES)):
+        load_handler(_name)
+bootstrap.prime_on_init()
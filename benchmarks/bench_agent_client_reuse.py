@@ -0,0 +1,124 @@
+"""
+Per-turn latency of invoke_agent with a new client per turn vs. the shared client.
+
+Offline (default), only the client setup cost is measured: credential and endpoint
+resolution for a fresh boto3.client("bedrock-agent-runtime") on every turn, compared
+with services.bedrock_agent_runtime.get_client(). No AWS calls are made.
+
+With --live, full chat turns are sent to a deployed agent and time-to-first-chunk and
+total turn latency are reported for both strategies (TLS handshakes included).
+
+Usage:
+    python benchmarks/bench_agent_client_reuse.py [--turns 50]
+    python benchmarks/bench_agent_client_reuse.py --live --agent-id ID --agent-alias-id ALIAS [--turns 10]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import uuid
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'optional-streamlit-app'))
+
+import boto3  # noqa: E402
+
+from services import bedrock_agent_runtime  # noqa: E402
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def report(name, samples):
+    print(f'{name:<24} mean {statistics.mean(samples) * 1000:9.2f} ms   '
+          f'p50 {percentile(samples, 50) * 1000:9.2f} ms   p95 {percentile(samples, 95) * 1000:9.2f} ms')
+
+
+def fresh_client():
+    return boto3.client(service_name='bedrock-agent-runtime', config=bedrock_agent_runtime.client_config())
+
+
+def run_turn(client, agent_id, agent_alias_id, session_id, prompt):
+    """Sends one prompt and returns (time to first chunk, total time) in seconds."""
+    started = time.perf_counter()
+    first_chunk = None
+    response = client.invoke_agent(
+        agentId=agent_id,
+        agentAliasId=agent_alias_id,
+        sessionId=session_id,
+        inputText=prompt,
+        streamingConfigurations={'streamFinalResponse': True}
+    )
+    for event in response['completion']:
+        if 'chunk' in event and first_chunk is None:
+            first_chunk = time.perf_counter() - started
+    total = time.perf_counter() - started
+    return first_chunk if first_chunk is not None else total, total
+
+
+def bench_offline(turns):
+    bedrock_agent_runtime.get_client()  # warm the shared client once, as the app does
+
+    per_turn = []
+    for _ in range(turns):
+        started = time.perf_counter()
+        fresh_client()
+        per_turn.append(time.perf_counter() - started)
+
+    shared = []
+    for _ in range(turns):
+        started = time.perf_counter()
+        bedrock_agent_runtime.get_client()
+        shared.append(time.perf_counter() - started)
+
+    print(f'client setup per turn ({turns} turns)')
+    report('new client per turn', per_turn)
+    report('shared client', shared)
+
+
+def bench_live(turns, agent_id, agent_alias_id, prompt):
+    results = {}
+    for name in ('new client per turn', 'shared client'):
+        session_id = str(uuid.uuid4())
+        first_chunks, totals = [], []
+        for _ in range(turns):
+            started = time.perf_counter()
+            client = fresh_client() if name == 'new client per turn' else bedrock_agent_runtime.get_client()
+            setup = time.perf_counter() - started
+            first_chunk, total = run_turn(client, agent_id, agent_alias_id, session_id, prompt)
+            first_chunks.append(setup + first_chunk)
+            totals.append(setup + total)
+        results[name] = (first_chunks, totals)
+
+    print(f'time to first chunk ({turns} turns)')
+    for name, (first_chunks, _) in results.items():
+        report(name, first_chunks)
+    print(f'total turn latency ({turns} turns)')
+    for name, (_, totals) in results.items():
+        report(name, totals)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--turns', type=int, default=50)
+    parser.add_argument('--live', action='store_true', help='invoke a deployed agent')
+    parser.add_argument('--agent-id', default=os.environ.get('BEDROCK_AGENT_ID'))
+    parser.add_argument('--agent-alias-id', default=os.environ.get('BEDROCK_AGENT_ALIAS_ID', 'TSTALIASID'))
+    parser.add_argument('--prompt', default='Hi')
+    args = parser.parse_args()
+
+    if args.live:
+        if not args.agent_id:
+            parser.error('--live requires --agent-id or BEDROCK_AGENT_ID')
+        bench_live(args.turns, args.agent_id, args.agent_alias_id, args.prompt)
+    else:
+        # No calls are made offline, but boto3 still needs a region to build the clients
+        os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+        bench_offline(args.turns)
+
+
+if __name__ == '__main__':
+    main()
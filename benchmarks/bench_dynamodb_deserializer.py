@@ -0,0 +1,97 @@
+"""
+Microbenchmark for converting DynamoDB items to Python dicts.
+
+Compares the loop the account status service used to run, boto3's TypeDeserializer,
+eazybank_common.dynamodb.deserialize_item and a precompiled Projection.
+
+Usage:
+    python benchmarks/bench_dynamodb_deserializer.py [--number 20000] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from eazybank_common.dynamodb import Projection, deserialize_item  # noqa: E402
+
+# The attributes of an application record, as returned by GetItem
+FLAT_ITEM = {
+    'phone_no': {'N': '2016166577'},
+    'user_name': {'S': 'Test User'},
+    'account_status': {'S': 'rejected'},
+    'reason': {'S': 'ErrorCode - InvalidAddressProof'},
+    'account_number': {'S': ''},
+    'account_balance': {'N': '0'},
+    'credit_card_number': {'S': ''},
+}
+
+# The same record with nested and set-typed attributes the agent never reads
+NESTED_ITEM = {
+    'phone_no': {'N': '2016166577'},
+    'user_name': {'S': 'Test User'},
+    'account_status': {'S': 'rejected'},
+    'reason': {'S': 'ErrorCode - InvalidAddressProof'},
+    'account_number': {'S': ''},
+    'account_balance': {'N': '0'},
+    'credit_card_number': {'S': ''},
+    'kyc_verified': {'BOOL': False},
+    'documents': {'L': [{'M': {'type': {'S': 'passport'}, 'pages': {'N': '2'}}},
+                        {'M': {'type': {'S': 'utility_bill'}, 'pages': {'N': '1'}}}]},
+    'tags': {'SS': ['savings', 'online']},
+    'risk_scores': {'NS': ['0.12', '0.4', '3']},
+    'created_at': {'N': '1718000000000'},
+}
+
+USER_DETAILS = Projection(
+    'phone_no',
+    'user_name',
+    'account_status',
+    'reason',
+    'account_number',
+    'account_balance',
+    'credit_card_number',
+    numbers_as_strings=True
+)
+
+
+def legacy_loop(item):
+    user_details = {}
+    for key, value in item.items():
+        user_details[key] = list(value.values())[0]
+    return user_details
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--number', type=int, default=20000, help='conversions per timing run')
+    parser.add_argument('--repeat', type=int, default=5, help='timing runs per candidate (best is reported)')
+    args = parser.parse_args()
+
+    candidates = [
+        ('legacy list(value.values())[0]', legacy_loop),
+        ('eazybank_common deserialize_item', deserialize_item),
+        ('eazybank_common Projection', USER_DETAILS),
+    ]
+    try:
+        from boto3.dynamodb.types import TypeDeserializer
+    except ImportError:
+        print('boto3 not installed; skipping TypeDeserializer')
+    else:
+        deserializer = TypeDeserializer()
+        candidates.insert(1, ('boto3 TypeDeserializer', lambda item: {k: deserializer.deserialize(v) for k, v in item.items()}))
+
+    for label, item in (('flat item', FLAT_ITEM), ('nested item', NESTED_ITEM)):
+        print(f"\n{label} ({len(item)} attributes)")
+        print(f"{'candidate':<36} {'usec/item':>10} {'relative':>9}")
+        baseline = None
+        for name, func in candidates:
+            best = min(timeit.repeat(lambda: func(item), number=args.number, repeat=args.repeat))
+            usec = best / args.number * 1e6
+            baseline = baseline or usec
+            print(f'{name:<36} {usec:>10.2f} {usec / baseline:>8.2f}x')
+
+
+if __name__ == '__main__':
+    main()
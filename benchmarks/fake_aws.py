@@ -0,0 +1,229 @@
+"""
+In-process stand-ins for the AWS services used by the Lambda handlers.
+
+Each fake sleeps for a configurable latency per call and counts calls per
+service/operation, so the load harness can report round trips per conversation
+without touching AWS. Only the operations the handlers use are implemented.
+"""
+import itertools
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+
+from botocore.exceptions import ClientError
+
+
+class CallRecorder:
+    """Thread-safe per-operation call counter shared by all fakes."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = Counter()
+
+    def record(self, service, operation):
+        with self._lock:
+            self.calls[f'{service}.{operation}'] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return Counter(self.calls)
+
+
+class FakeService:
+    service_name = None
+
+    def __init__(self, recorder, latency_ms=0.0, jitter=0.0):
+        self.recorder = recorder
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter
+
+    def _call(self, operation):
+        self.recorder.record(self.service_name, operation)
+        if self.latency > 0:
+            delay = self.latency
+            if self.jitter:
+                delay *= random.uniform(1 - self.jitter, 1 + self.jitter)
+            time.sleep(delay)
+
+
+def _project(item, kwargs):
+    """Applies a ProjectionExpression made of plain or #placeholder attribute names."""
+    expression = kwargs.get('ProjectionExpression')
+    if not expression:
+        return dict(item)
+    names = kwargs.get('ExpressionAttributeNames', {})
+    wanted = [names.get(token.strip(), token.strip()) for token in expression.split(',')]
+    return {name: item[name] for name in wanted if name in item}
+
+
+class FakeDynamoDB(FakeService):
+    """
+    Low-level DynamoDB client storing items in wire format.
+
+    Writes append stream records (INSERT/MODIFY) that the harness feeds to the
+    stream-triggered notifier, mirroring DynamoDB Streams with NEW_IMAGE.
+    """
+    service_name = 'dynamodb'
+
+    def __init__(self, recorder, key_schema, latency_ms=0.0, jitter=0.0, unprocessed_rate=0.0, throttle_rate=0.0):
+        super().__init__(recorder, latency_ms, jitter)
+        self.key_schema = key_schema  # table name -> tuple of key attribute names
+        self.unprocessed_rate = unprocessed_rate
+        self.throttle_rate = throttle_rate
+        self.tables = {name: {} for name in key_schema}
+        self._lock = threading.Lock()
+        self._sequence = itertools.count(1)
+        self.stream_records = {name: [] for name in key_schema}
+
+    def _key(self, table, key_or_item):
+        return tuple(next(iter(key_or_item[name].values())) for name in self.key_schema[table])
+
+    def _write(self, table, item):
+        with self._lock:
+            self._write_locked(table, item)
+
+    def _write_locked(self, table, item):
+        key = self._key(table, item)
+        old = self.tables[table].get(key)
+        self.tables[table][key] = item
+        if old == item:
+            return  # Streams do not emit records for writes that change nothing
+        self.stream_records[table].append({
+            'eventName': 'MODIFY' if old is not None else 'INSERT',
+            'dynamodb': {
+                'SequenceNumber': str(next(self._sequence)),
+                'NewImage': item,
+            }
+        })
+
+    def drain_stream(self, table):
+        with self._lock:
+            records, self.stream_records[table] = self.stream_records[table], []
+        return records
+
+    def seed(self, table, items):
+        for item in items:
+            self.tables[table][self._key(table, item)] = item
+
+    def get_item(self, TableName, Key, **kwargs):
+        self._call('GetItem')
+        item = self.tables[TableName].get(self._key(TableName, Key))
+        return {'Item': _project(item, kwargs)} if item is not None else {}
+
+    def batch_get_item(self, RequestItems):
+        self._call('BatchGetItem')
+        responses, unprocessed = {}, {}
+        for table, request in RequestItems.items():
+            found, retry = [], []
+            for key in request['Keys']:
+                if self.unprocessed_rate and random.random() < self.unprocessed_rate:
+                    retry.append(key)
+                    continue
+                item = self.tables[table].get(self._key(table, key))
+                if item is not None:
+                    found.append(_project(item, request))
+            responses[table] = found
+            if retry:
+                unprocessed[table] = dict(request, Keys=retry)
+        return {'Responses': responses, 'UnprocessedKeys': unprocessed}
+
+    def put_item(self, TableName, Item, ConditionExpression=None, **kwargs):
+        """Supports no condition or 'attribute_not_exists(<key attribute>)'."""
+        self._call('PutItem')
+        if self.throttle_rate and random.random() < self.throttle_rate:
+            raise ClientError(
+                {'Error': {'Code': 'ProvisionedThroughputExceededException',
+                           'Message': 'The level of configured provisioned throughput for the table was exceeded'}},
+                'PutItem'
+            )
+        if ConditionExpression is not None:
+            if not ConditionExpression.startswith('attribute_not_exists('):
+                raise NotImplementedError(ConditionExpression)
+            with self._lock:
+                if self._key(TableName, Item) in self.tables[TableName]:
+                    raise ClientError(
+                        {'Error': {'Code': 'ConditionalCheckFailedException',
+                                   'Message': 'The conditional request failed'}},
+                        'PutItem'
+                    )
+                self._write_locked(TableName, Item)
+            return {}
+        self._write(TableName, Item)
+        return {}
+
+    def batch_write_item(self, RequestItems):
+        self._call('BatchWriteItem')
+        unprocessed = {}
+        for table, requests in RequestItems.items():
+            retry = []
+            for request in requests:
+                if self.unprocessed_rate and random.random() < self.unprocessed_rate:
+                    retry.append(request)
+                    continue
+                self._write(table, request['PutRequest']['Item'])
+            if retry:
+                unprocessed[table] = retry
+        return {'UnprocessedItems': unprocessed}
+
+
+class FakeSQS(FakeService):
+    service_name = 'sqs'
+
+    def __init__(self, recorder, latency_ms=0.0, jitter=0.0):
+        super().__init__(recorder, latency_ms, jitter)
+        self._lock = threading.Lock()
+        self.messages = []
+        self.deduplicated = 0
+        self.bytes_sent = 0
+        self._dedup_ids = {}  # MessageDeduplicationId -> MessageId (the window never expires here)
+
+    def send_message(self, QueueUrl, MessageBody, **kwargs):
+        self._call('SendMessage')
+        dedup_id = kwargs.get('MessageDeduplicationId')
+        with self._lock:
+            if dedup_id is not None and dedup_id in self._dedup_ids:
+                # FIFO queues accept the send but do not deliver the duplicate
+                self.deduplicated += 1
+                return {'MessageId': self._dedup_ids[dedup_id]}
+            message_id = str(uuid.uuid4())
+            self.bytes_sent += len(MessageBody.encode('utf-8'))
+            if dedup_id is not None:
+                self._dedup_ids[dedup_id] = message_id
+            self.messages.append({'messageId': message_id, 'body': MessageBody, 'attributes': kwargs})
+        return {'MessageId': message_id}
+
+    def drain(self):
+        with self._lock:
+            messages, self.messages = self.messages, []
+        return messages
+
+
+class FakeSNS(FakeService):
+    service_name = 'sns'
+
+    def __init__(self, recorder, latency_ms=0.0, jitter=0.0):
+        super().__init__(recorder, latency_ms, jitter)
+        self._lock = threading.Lock()
+        self.published = []
+        self.published_at = []  # perf_counter() per published message
+
+    def publish(self, TopicArn, Message, **kwargs):
+        self._call('Publish')
+        with self._lock:
+            self.published.append(Message)
+            self.published_at.append(time.perf_counter())
+        return {'MessageId': str(uuid.uuid4())}
+
+    def publish_batch(self, TopicArn, PublishBatchRequestEntries):
+        self._call('PublishBatch')
+        now = time.perf_counter()
+        with self._lock:
+            self.published.extend(entry['Message'] for entry in PublishBatchRequestEntries)
+            self.published_at.extend(now for _ in PublishBatchRequestEntries)
+        return {
+            'Successful': [{'Id': entry['Id'], 'MessageId': str(uuid.uuid4())} for entry in PublishBatchRequestEntries],
+            'Failed': []
+        }
+
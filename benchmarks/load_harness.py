@@ -0,0 +1,436 @@
+"""
+Concurrent load harness for the whole agent flow, run in-process.
+
+Replays scripted conversations based on the README test scenarios against every
+Lambda handler, with AWS replaced by the latency-configurable fakes in fake_aws.py:
+
+  - account status lookups for the five test mobile numbers (plus an unknown number),
+  - rejected applicants asking for the status again and for rejection details,
+  - human handoff, carried through the whole pipeline:
+    publish-to-sqs-svc -> SQS -> human-agent-request-tracker -> DynamoDB Streams
+    -> human-agent-notification-service -> SNS.
+
+Many sessions run concurrently on a thread pool. The report shows p50/p95/p99 latency
+and throughput per handler, and DynamoDB/SQS/SNS calls per conversation.
+
+Usage:
+    python benchmarks/load_harness.py [--sessions 500] [--concurrency 32]
+        [--dynamodb-latency-ms 8] [--sqs-latency-ms 15] [--sns-latency-ms 20] [--json]
+"""
+import argparse
+import contextlib
+import importlib.util
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import fake_aws  # noqa: E402
+from eazybank_common import bootstrap, payload, phone  # noqa: E402
+from eazybank_common.bloom import BloomFilter  # noqa: E402
+
+APPLICATIONS_TABLE = 'eazybank-applications'
+REQUESTS_TABLE = 'eazybank-human-agent-requests'
+QUEUE_URL = 'https://sqs.local/000000000000/eazybank-human-handoff.fifo'
+TOPIC_ARN = 'arn:aws:sns:local:000000000000:eazybank-human-handoff'
+
+HANDLERS = {
+    'account_status': 'account_status_agent/new-account-status-svc.py',
+    'publish_to_sqs': 'human_handoff_agent/publish-to-sqs-svc.py',
+    'request_tracker': 'human_handoff_agent/human-agent-request-tracker.py',
+    'notification': 'human_handoff_agent/human-agent-notification-service.py',
+    'rejection_reason': 'rejection_reason_agent/rejection-reason-lookup-svc.py',
+}
+ROUTER = 'action_group_router/action-group-router.py'
+ROUTED_HANDLERS = ('account_status', 'publish_to_sqs', 'rejection_reason')
+
+# The README test numbers: 2016166576 and 2016166580 are approved, the rest rejected
+APPLICATIONS = [
+    {'phone_no': {'N': '2016166576'}, 'user_name': {'S': 'Approved User One'}, 'account_status': {'S': 'active'},
+     'reason': {'S': ''}, 'account_number': {'S': '100000000576'}, 'account_balance': {'N': '2500.75'},
+     'credit_card_number': {'S': '4111111111110576'}},
+    {'phone_no': {'N': '2016166577'}, 'user_name': {'S': 'Rejected User One'}, 'account_status': {'S': 'rejected'},
+     'reason': {'S': 'InvalidIdentification'}},
+    {'phone_no': {'N': '2016166578'}, 'user_name': {'S': 'Rejected User Two'}, 'account_status': {'S': 'rejected'},
+     'reason': {'S': 'InvalidAddressProof'}},
+    {'phone_no': {'N': '2016166579'}, 'user_name': {'S': 'Rejected User Three'}, 'account_status': {'S': 'rejected'},
+     'reason': {'S': 'InvalidPhotograph'}},
+    {'phone_no': {'N': '2016166580'}, 'user_name': {'S': 'Approved User Two'}, 'account_status': {'S': 'active'},
+     'reason': {'S': ''}, 'account_number': {'S': '100000000580'}, 'account_balance': {'N': '120'},
+     'credit_card_number': {'S': '4111111111110580'}},
+]
+
+# Earlier turns prepended to each handoff's history with --history-kb
+FILLER_TURNS = [
+    'User: can you tell me what documents I need for a savings account?',
+    'Agent: You need a valid photo identification, a proof of address and a recent photograph.',
+    'User: how long does the review usually take?',
+    'Agent: Most applications are reviewed within two business days.',
+]
+
+# Each step is (action, argument). 'status' looks up a phone number, 'status_with_reason' looks
+# it up together with the rejection explanation, 'rejection' asks for the details of a
+# rejection reason, 'probe' looks up that many random unknown numbers (a retyping user or a
+# bot) and 'handoff' asks for a human.
+CONVERSATIONS = {
+    'approved_status': [('status', '2016166576')],
+    'approved_status_2': [('status', '2016166580')],
+    'rejected_follow_up': [('status', '2016166577'), ('status', '2016166577'),
+                           ('rejection', 'InvalidIdentification')],
+    'rejected_then_handoff': [('status', '2016166578'), ('rejection', 'InvalidAddressProof'),
+                              ('handoff', 'Connect me to a human agent')],
+    'rejected_photo_follow_up': [('status', '2016166579'), ('rejection', 'InvalidPhotograph')],
+    'rejected_combined': [('status_with_reason', '2016166577')],
+    'unknown_number_handoff': [('status', '2016169999'), ('handoff', 'I need help from a human')],
+    'direct_handoff': [('handoff', 'I want to speak to a human agent')],
+    'mistyped_numbers': [('status', '201 616-6576'), ('status', '20161665'), ('status', '+1 (201) 616-6580')],
+    'number_probe': [('probe', 5)],
+    'repeated_handoff': [('handoff', 'I want to speak to a human agent'), ('handoff', 'Is anyone there?')],
+}
+
+
+class Harness:
+    def __init__(self, args):
+        self.args = args
+        self.recorder = fake_aws.CallRecorder()
+        self.dynamodb = fake_aws.FakeDynamoDB(
+            self.recorder,
+            {APPLICATIONS_TABLE: ('phone_no',), REQUESTS_TABLE: ('session_id', 'requested_at')},
+            latency_ms=args.dynamodb_latency_ms,
+            jitter=args.jitter,
+            unprocessed_rate=args.unprocessed_rate,
+            throttle_rate=args.throttle_rate
+        )
+        self.dynamodb.seed(APPLICATIONS_TABLE, APPLICATIONS)
+        self.sqs = fake_aws.FakeSQS(self.recorder, latency_ms=args.sqs_latency_ms, jitter=args.jitter)
+        self.sns = fake_aws.FakeSNS(self.recorder, latency_ms=args.sns_latency_ms, jitter=args.jitter)
+        self.latencies = defaultdict(list)
+        self._latency_lock = threading.Lock()
+        self._pipeline_lock = threading.Lock()
+        self.handoff_started = {}  # session_id -> perf_counter() of its first handoff call
+        self.handlers = {}
+
+    # --- AWS wiring -------------------------------------------------------------------
+
+    def install_clients(self):
+        # The handlers get their clients from the shared bootstrap module
+        bootstrap.set_client('dynamodb', self.dynamodb)
+        bootstrap.set_client('sqs', self.sqs)
+        bootstrap.set_client('sns', self.sns)
+        if self.args.claim_check_dir:
+            payload.set_store(payload.LocalFileStore(self.args.claim_check_dir))
+        if self.args.phone_filter:
+            bloom_filter = BloomFilter.for_capacity(len(APPLICATIONS), self.args.phone_filter_fp_rate)
+            for item in APPLICATIONS:
+                bloom_filter.add(item['phone_no']['N'])
+            phone.set_filter(bloom_filter)
+
+    def load_handlers(self):
+        os.environ.update({
+            'AWS_DEFAULT_REGION': os.environ.get('AWS_DEFAULT_REGION', 'us-east-1'),
+            'SQS_QUEUE_URL': QUEUE_URL,
+            'DYNAMODB_TABLE_NAME': REQUESTS_TABLE,
+            'SNS_TOPIC_ARN': TOPIC_ARN,
+            'HANDOFF_MODE': self.args.handoff_mode,
+        })
+        if not self.args.verbose:
+            os.environ['LOG_LEVEL'] = 'WARNING'
+        if self.args.no_cache:
+            os.environ['CACHE_MAX_ENTRIES'] = '0'
+        for name, path in HANDLERS.items():
+            spec = importlib.util.spec_from_file_location(f'harness_{name}', os.path.join(ROOT, path))
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            self.handlers[name] = module.lambda_handler
+        if self.args.router:
+            # The action groups all go through the single router function instead
+            spec = importlib.util.spec_from_file_location('harness_router', os.path.join(ROOT, ROUTER))
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            for name in ROUTED_HANDLERS:
+                self.handlers[name] = module.lambda_handler
+
+    # --- Invocation -------------------------------------------------------------------
+
+    def invoke(self, name, event):
+        started = time.perf_counter()
+        response = self.handlers[name](event, None)
+        elapsed = time.perf_counter() - started
+        with self._latency_lock:
+            self.latencies[name].append(elapsed)
+        return response
+
+    def status_event(self, session, phone_no, api_path='/getuserdetails'):
+        return {
+            'messageVersion': '1.0',
+            'actionGroup': 'account_status_action_group',
+            'apiPath': api_path,
+            'httpMethod': 'GET',
+            'sessionId': session['session_id'],
+            'parameters': [{'name': 'phone_no', 'type': 'string', 'value': phone_no}],
+            'sessionAttributes': session['session_attributes'],
+            'promptSessionAttributes': session['prompt_session_attributes'],
+        }
+
+    def rejection_event(self, session, error_code):
+        return {
+            'messageVersion': '1.0',
+            'actionGroup': 'rejection_reason_action_group',
+            'apiPath': '/getrejectionreason',
+            'httpMethod': 'GET',
+            'sessionId': session['session_id'],
+            'parameters': [{'name': 'error_code', 'type': 'string', 'value': error_code}],
+            'sessionAttributes': session['session_attributes'],
+            'promptSessionAttributes': session['prompt_session_attributes'],
+        }
+
+    def handoff_event(self, session, user_message):
+        properties = {
+            'user_message': user_message,
+            'conversation_history': '\n'.join(session['filler'] + session['history']),
+            'session_id': session['session_id'],
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+        }
+        return {
+            'messageVersion': '1.0',
+            'actionGroup': 'human_handoff_action_group',
+            'apiPath': '/store_conversation_data',
+            'httpMethod': 'POST',
+            'sessionId': session['session_id'],
+            'requestBody': {'content': {'application/json': {'properties': [
+                {'name': name, 'type': 'string', 'value': value} for name, value in properties.items()
+            ]}}},
+            'sessionAttributes': session['session_attributes'],
+            'promptSessionAttributes': session['prompt_session_attributes'],
+        }
+
+    def filler(self):
+        turns = []
+        size = 0
+        while size < self.args.history_kb * 1024:
+            turn = f'{random.choice(FILLER_TURNS)} ({len(turns)})'
+            turns.append(turn)
+            size += len(turn) + 1
+        return turns
+
+    def carry_session(self, session, response):
+        # Bedrock passes the returned session attributes into the next action group call
+        if isinstance(response, dict) and 'sessionAttributes' in response:
+            session['session_attributes'] = response['sessionAttributes']
+            session['prompt_session_attributes'] = response['promptSessionAttributes']
+
+    def drain_pipeline(self):
+        """
+        Delivers queued SQS messages to the tracker and stream records to the notifier.
+        With --redelivery-rate, SQS's at-least-once delivery is simulated by delivering
+        some messages a second time. Messages the tracker reports as failed are
+        redelivered (up to 5 times).
+        """
+        with self._pipeline_lock:
+            messages = self.sqs.drain()
+            if messages and self.args.sqs_poll_ms:
+                time.sleep(self.args.sqs_poll_ms / 1000)  # Event source mapping polling delay
+            messages += [message for message in messages if random.random() < self.args.redelivery_rate]
+            for _ in range(6):
+                failed = set()
+                for start in range(0, len(messages), self.args.sqs_batch_size):
+                    response = self.invoke('request_tracker', {'Records': [
+                        {'messageId': message['messageId'], 'body': message['body']}
+                        for message in messages[start:start + self.args.sqs_batch_size]
+                    ]})
+                    failed.update(failure['itemIdentifier'] for failure in response['batchItemFailures'])
+                messages = [message for message in messages if message['messageId'] in failed]
+                if not messages:
+                    break
+            records = self.dynamodb.drain_stream(REQUESTS_TABLE)
+            for start in range(0, len(records), self.args.stream_batch_size):
+                self.invoke('notification', {'Records': records[start:start + self.args.stream_batch_size]})
+
+    def run_conversation(self, name):
+        session = {
+            'session_id': str(uuid.uuid4()),
+            'session_attributes': {},
+            'prompt_session_attributes': {},
+            'history': [],
+            'filler': self.filler(),
+        }
+        for action, argument in CONVERSATIONS[name]:
+            if action == 'status':
+                session['history'].append(f'User: my mobile number is {argument}')
+                response = self.invoke('account_status', self.status_event(session, argument))
+            elif action == 'status_with_reason':
+                session['history'].append(f'User: my mobile number is {argument}, why was I rejected?')
+                response = self.invoke('account_status',
+                                       self.status_event(session, argument, '/getuserdetailswithreason'))
+            elif action == 'probe':
+                for _ in range(argument):
+                    number = str(random.randint(3000000000, 9999999999))
+                    session['history'].append(f'User: my mobile number is {number}')
+                    response = self.invoke('account_status', self.status_event(session, number))
+            elif action == 'rejection':
+                session['history'].append('User: why was my application rejected?')
+                response = self.invoke('rejection_reason', self.rejection_event(session, argument))
+            else:
+                session['history'].append(f'User: {argument}')
+                event = self.handoff_event(session, argument)
+                self.handoff_started.setdefault(session['session_id'], time.perf_counter())
+                response = self.invoke('publish_to_sqs', event)
+                if random.random() < self.args.retry_rate:
+                    # The response was lost and the same action group call is retried
+                    response = self.invoke('publish_to_sqs', event)
+                self.drain_pipeline()
+            self.carry_session(session, response)
+
+    # --- Reporting --------------------------------------------------------------------
+
+    def run(self):
+        self.install_clients()
+        # Handler logging would dominate the output (and the timings) unless asked for
+        with open(os.devnull, 'w') as devnull:
+            output = contextlib.nullcontext() if self.args.verbose else contextlib.redirect_stdout(devnull)
+            try:
+                with output:
+                    self.load_handlers()
+                    rng = random.Random(self.args.seed)
+                    names = [rng.choice(list(CONVERSATIONS)) for _ in range(self.args.sessions)]
+
+                    started = time.perf_counter()
+                    with ThreadPoolExecutor(max_workers=self.args.concurrency) as executor:
+                        list(executor.map(self.run_conversation, names))
+                    self.drain_pipeline()
+                    wall_time = time.perf_counter() - started
+            finally:
+                bootstrap.reset_clients()
+        return self.report(names, wall_time)
+
+    def report(self, names, wall_time):
+        handlers = {}
+        for name, samples in sorted(self.latencies.items()):
+            ordered = sorted(samples)
+            handlers[name] = {
+                'invocations': len(samples),
+                'p50_ms': percentile(ordered, 50) * 1000,
+                'p95_ms': percentile(ordered, 95) * 1000,
+                'p99_ms': percentile(ordered, 99) * 1000,
+                'mean_ms': statistics.mean(ordered) * 1000,
+                'throughput_per_s': len(samples) / wall_time,
+            }
+        calls = self.recorder.snapshot()
+        return {
+            'sessions': len(names),
+            'concurrency': self.args.concurrency,
+            'wall_time_s': wall_time,
+            'conversations_per_s': len(names) / wall_time,
+            'handlers': handlers,
+            'aws_calls': dict(sorted(calls.items())),
+            'aws_calls_per_conversation': {op: count / len(names) for op, count in sorted(calls.items())},
+            'notifications_published': len(self.sns.published),
+            'handoff_requests_stored': len(self.dynamodb.tables[REQUESTS_TABLE]),
+            'sqs_duplicates_dropped': self.sqs.deduplicated,
+            'sqs_message_bytes': self.sqs.bytes_sent,
+            'sns_message_bytes': sum(len(message) for message in self.sns.published),
+            'handoff_mode': self.args.handoff_mode,
+            'time_to_page_ms': self.time_to_page(),
+        }
+
+    def time_to_page(self):
+        """Time from a session's first handoff call to its SNS notification."""
+        samples = []
+        for published_at, message in zip(self.sns.published_at, self.sns.published):
+            started = self.handoff_started.get(json.loads(message).get('session_id'))
+            if started is not None:
+                samples.append(published_at - started)
+        ordered = sorted(samples)
+        return {
+            'pages': len(ordered),
+            'p50': percentile(ordered, 50) * 1000,
+            'p95': percentile(ordered, 95) * 1000,
+            'p99': percentile(ordered, 99) * 1000,
+        }
+
+
+def percentile(ordered, pct):
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def print_report(report):
+    print(f"{report['sessions']} conversations, concurrency {report['concurrency']}, "
+          f"{report['wall_time_s']:.2f} s wall time, {report['conversations_per_s']:.1f} conversations/s")
+    print()
+    print(f"{'handler':<18} {'calls':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'calls/s':>9}")
+    for name, stats in report['handlers'].items():
+        print(f"{name:<18} {stats['invocations']:>7} {stats['p50_ms']:>9.2f} {stats['p95_ms']:>9.2f} "
+              f"{stats['p99_ms']:>9.2f} {stats['throughput_per_s']:>9.1f}")
+    print()
+    print(f"{'AWS operation':<26} {'total':>7} {'per conversation':>17}")
+    for operation, count in report['aws_calls'].items():
+        print(f"{operation:<26} {count:>7} {report['aws_calls_per_conversation'][operation]:>17.2f}")
+    print()
+    print(f"SNS notifications published: {report['notifications_published']} "
+          f"for {report['handoff_requests_stored']} stored handoff requests "
+          f"({report['sqs_duplicates_dropped']} duplicate SQS sends dropped)")
+    print(f"Message bytes: SQS {report['sqs_message_bytes']}, SNS {report['sns_message_bytes']}")
+    page = report['time_to_page_ms']
+    print(f"Time to page ({report['handoff_mode']} mode): p50 {page['p50']:.2f} ms, "
+          f"p95 {page['p95']:.2f} ms, p99 {page['p99']:.2f} ms over {page['pages']} pages")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sessions', type=int, default=500, help='conversations to replay')
+    parser.add_argument('--concurrency', type=int, default=32, help='conversations in flight at once')
+    parser.add_argument('--dynamodb-latency-ms', type=float, default=8.0)
+    parser.add_argument('--sqs-latency-ms', type=float, default=15.0)
+    parser.add_argument('--sns-latency-ms', type=float, default=20.0)
+    parser.add_argument('--jitter', type=float, default=0.2, help='relative latency jitter, e.g. 0.2 for +/-20%%')
+    parser.add_argument('--unprocessed-rate', type=float, default=0.0,
+                        help='fraction of batch keys/items DynamoDB leaves unprocessed')
+    parser.add_argument('--retry-rate', type=float, default=0.0,
+                        help='fraction of handoff calls retried with the same event')
+    parser.add_argument('--redelivery-rate', type=float, default=0.0,
+                        help='fraction of SQS messages delivered to the tracker twice')
+    parser.add_argument('--history-kb', type=float, default=0.0,
+                        help='earlier conversation (in KB) included in every handoff history')
+    parser.add_argument('--claim-check-dir', help='spill oversized histories to this directory')
+    parser.add_argument('--handoff-mode', choices=('queue', 'fast'), default='queue',
+                        help='HANDOFF_MODE of the publisher: through SQS, or direct to DynamoDB')
+    parser.add_argument('--throttle-rate', type=float, default=0.0,
+                        help='fraction of DynamoDB PutItem calls that are throttled')
+    parser.add_argument('--sqs-poll-ms', type=float, default=0.0,
+                        help='delay before queued messages reach the tracker')
+    parser.add_argument('--router', action='store_true',
+                        help='invoke the action groups through the single action group router')
+    parser.add_argument('--phone-filter', action='store_true',
+                        help='answer unknown phone numbers from a Bloom filter of the seeded applications')
+    parser.add_argument('--phone-filter-fp-rate', type=float, default=0.001)
+    parser.add_argument('--sqs-batch-size', type=int, default=10)
+    parser.add_argument('--stream-batch-size', type=int, default=100)
+    parser.add_argument('--no-cache', action='store_true', help='disable the account status lookup cache')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    parser.add_argument('--verbose', action='store_true', help='show handler log output')
+    args = parser.parse_args()
+
+    report = Harness(args).run()
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,6 @@
+"""
+Helpers shared by the EazyBank AgentVerse Lambda functions.
+
+This package is deployed as a Lambda layer (python/eazybank_common) and attached to
+every function in the account status and human handoff action groups.
+"""
@@ -0,0 +1,79 @@
+"""
+Compact Bloom filter for set membership with a tunable false-positive rate.
+
+A filter answers "definitely not in the set" or "possibly in the set". It is sized
+from the expected number of keys and the target false-positive rate:
+
+    bloom_filter = BloomFilter.for_capacity(50000, 0.001)  # ~88 KB, 10 hash functions
+    bloom_filter.add('2016166576')
+    '2016166577' in bloom_filter  # False, or True with probability ~0.001
+
+Bit positions are derived from one BLAKE2b digest per key (double hashing), so a
+lookup is a hash plus k bit tests. to_bytes()/from_bytes() use a small header, so a
+filter built offline can ship in the layer or be loaded from S3.
+"""
+import hashlib
+import math
+import struct
+import time
+
+MAGIC = b'EZBF'
+FORMAT_VERSION = 1
+# magic, version, hash count, bit count, key count, build time (epoch seconds)
+_HEADER = struct.Struct('>4sBBQQd')
+
+
+class BloomFilter:
+
+    def __init__(self, num_bits, num_hashes, bits=None, count=0, built_at=None):
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.bits = bytearray((num_bits + 7) // 8) if bits is None else bytearray(bits)
+        self.count = count
+        self.built_at = time.time() if built_at is None else built_at
+
+    @classmethod
+    def for_capacity(cls, capacity, fp_rate):
+        """A filter holding `capacity` keys at (about) the given false-positive rate."""
+        if not 0 < fp_rate < 1:
+            raise ValueError('fp_rate must be between 0 and 1')
+        capacity = max(1, capacity)
+        num_bits = max(8, math.ceil(-capacity * math.log(fp_rate) / (math.log(2) ** 2)))
+        num_hashes = max(1, round(num_bits / capacity * math.log(2)))
+        return cls(num_bits, num_hashes)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key):
+        bits = self.bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def __len__(self):
+        return self.count
+
+    def expected_fp_rate(self):
+        """The false-positive rate for the keys added so far."""
+        return (1 - math.exp(-self.num_hashes * self.count / self.num_bits)) ** self.num_hashes
+
+    def to_bytes(self):
+        header = _HEADER.pack(MAGIC, FORMAT_VERSION, self.num_hashes, self.num_bits, self.count, self.built_at)
+        return header + bytes(self.bits)
+
+    @classmethod
+    def from_bytes(cls, blob):
+        magic, version, num_hashes, num_bits, count, built_at = _HEADER.unpack_from(blob)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError('Not a Bloom filter in a supported format')
+        bits = blob[_HEADER.size:]
+        if len(bits) != (num_bits + 7) // 8:
+            raise ValueError('Truncated Bloom filter')
+        return cls(num_bits, num_hashes, bits, count, built_at)
@@ -0,0 +1,169 @@
+"""
+Lazy, per-container AWS client initialization shared by the Lambda handlers.
+
+Clients are created on first use and cached for the life of the container, so a
+handler only pays for the services it actually calls. boto3 itself is imported
+lazily as well. Handlers can register priming hooks that run during the init phase
+(PRIME_ON_INIT=true, useful with provisioned concurrency) or before a SnapStart
+snapshot is taken.
+
+Handlers that need their own client settings register them under a client name, so
+handlers sharing a container (see action_group_router) do not change each other's
+clients:
+
+    bootstrap.configure_client('dynamodb', name='handoff', read_timeout=2)
+    bootstrap.get_client('dynamodb', name='handoff')
+"""
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+_BOOTSTRAP_IMPORTED = time.perf_counter()
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_clients = {}  # (service, name) -> client
+_installed = {}  # (service, name) -> client installed with set_client()
+_client_configs = {}  # (service, name) -> botocore Config settings
+_priming_hooks = []
+_priming_deferred = False
+_cold_start = True
+
+# Init-phase measurements in milliseconds, e.g. {'import.boto3': 180.2, 'client.dynamodb': 45.1}
+timings = {}
+
+
+def _boto3():
+    started = time.perf_counter()
+    import boto3
+    if 'import.boto3' not in timings:
+        timings['import.boto3'] = (time.perf_counter() - started) * 1000
+    return boto3
+
+
+def configure_client(service_name, name=None, **config):
+    """
+    Registers botocore Config settings for a service's client (or its client called
+    `name`). Must be called before the client is first used (typically at module level
+    in the handler).
+    """
+    _client_configs[(service_name, name)] = config
+
+
+def get_client(service_name, name=None):
+    """
+    Returns the cached low-level client for a service, creating it on first use. A
+    name selects a separately configured client of the same service.
+    """
+    key = (service_name, name)
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _installed.get(key) or _installed.get((service_name, None))
+        if client is None:
+            boto3 = _boto3()
+            started = time.perf_counter()
+            config = _client_configs.get(key)
+            if config:
+                from botocore.config import Config
+                client = boto3.client(service_name, config=Config(**config))
+            else:
+                client = boto3.client(service_name)
+            timings['.'.join(filter(None, ['client', service_name, name]))] = (time.perf_counter() - started) * 1000
+        _clients[key] = client
+    return client
+
+
+def set_client(service_name, client, name=None):
+    """
+    Installs a client for a service (e.g. a local stand-in for load tests). Without a
+    name it is also used for the service's named clients.
+    """
+    with _lock:
+        _installed[(service_name, name)] = client
+        for key in [key for key in _clients if key[0] == service_name]:
+            del _clients[key]
+
+
+def reset_clients():
+    """Drops all cached and installed clients; they are recreated on next use."""
+    with _lock:
+        _clients.clear()
+        _installed.clear()
+
+
+def register_priming_hook(hook):
+    """Registers a callable that warms up the container. Can be used as a decorator."""
+    _priming_hooks.append(hook)
+    return hook
+
+
+def prime():
+    """Runs all priming hooks. Failures are logged and never break initialization."""
+    started = time.perf_counter()
+    for hook in _priming_hooks:
+        try:
+            hook()
+        except Exception as e:
+            logger.warning("Priming hook %s failed: %s", getattr(hook, '__name__', hook), e)
+    timings['prime'] = (time.perf_counter() - started) * 1000
+
+
+def prime_on_init():
+    """Primes the container during the init phase when PRIME_ON_INIT is enabled."""
+    if not _priming_deferred and os.environ.get('PRIME_ON_INIT', 'false').lower() == 'true':
+        prime()
+
+
+@contextmanager
+def deferred_priming():
+    """
+    Makes prime_on_init() a no-op within the block, e.g. while a router imports several
+    handlers, so the hooks run once when the router calls prime_on_init() itself.
+    """
+    global _priming_deferred
+    previous, _priming_deferred = _priming_deferred, True
+    try:
+        yield
+    finally:
+        _priming_deferred = previous
+
+
+def is_cold_start():
+    """Returns True for the first invocation in this container, False afterwards."""
+    global _cold_start
+    cold, _cold_start = _cold_start, False
+    return cold
+
+
+def init_report():
+    """Init-phase measurements: time since bootstrap import plus per-step timings."""
+    return {
+        'since_bootstrap_import_ms': round((time.perf_counter() - _BOOTSTRAP_IMPORTED) * 1000, 2),
+        **{name: round(value, 2) for name, value in timings.items()}
+    }
+
+
+def _after_restore():
+    # Pooled connections do not survive a snapshot; clients are rebuilt cheaply from
+    # the already-loaded botocore models.
+    reset_clients()
+    global _cold_start
+    _cold_start = True
+
+
+try:
+    from snapshot_restore_py import register_after_restore, register_before_snapshot
+except ImportError:
+    # Not running on a SnapStart-enabled runtime
+    pass
+else:
+    register_before_snapshot(prime)
+    register_after_restore(_after_restore)
@@ -0,0 +1,157 @@
+import base64
+from decimal import Decimal
+
+
+def _number(raw):
+    # Integers are by far the most common case (phone numbers, balances in minor units)
+    if raw.isdigit():
+        return int(raw)
+    if '.' in raw or 'e' in raw or 'E' in raw:
+        return Decimal(raw)
+    return int(raw)
+
+
+def _binary(raw):
+    # The low-level client returns bytes; DynamoDB Streams events carry base64 text
+    if isinstance(raw, str):
+        return base64.b64decode(raw)
+    return bytes(raw)
+
+
+def _list(raw):
+    result = []
+    for value in raw:
+        (type_tag, element), = value.items()
+        result.append(element if type_tag == 'S' else _DECODERS[type_tag](element))
+    return result
+
+
+_DECODERS = {
+    'S': str,
+    'N': _number,
+    'BOOL': bool,
+    'NULL': lambda raw: None,
+    'L': _list,
+    'SS': set,
+    'NS': lambda raw: {_number(value) for value in raw},
+    'B': _binary,
+    'BS': lambda raw: {_binary(value) for value in raw},
+}
+
+
+def deserialize(value):
+    """
+    Converts a single DynamoDB attribute value (e.g. {'N': '42'}) to a Python value.
+
+    Numbers become int when integral and Decimal otherwise, sets become Python sets and
+    maps and lists are converted recursively.
+    """
+    try:
+        (type_tag, raw), = value.items()
+        return raw if type_tag == 'S' else _DECODERS[type_tag](raw)
+    except (KeyError, ValueError):
+        raise TypeError(f'Unsupported DynamoDB attribute value with type tags {list(value)}') from None
+
+
+def deserialize_item(item):
+    """Converts a whole DynamoDB item (attribute name -> attribute value) to a plain dict."""
+    result = {}
+    try:
+        for key, value in item.items():
+            # Each attribute value holds exactly one type tag: unpack it and dispatch once.
+            # Strings need no conversion and integers are handled inline.
+            (type_tag, raw), = value.items()
+            if type_tag == 'S':
+                result[key] = raw
+            elif type_tag == 'N' and raw.isdigit():
+                result[key] = int(raw)
+            else:
+                result[key] = _DECODERS[type_tag](raw)
+    except (KeyError, ValueError):
+        raise TypeError(f'Unsupported DynamoDB attribute value for {key}: type tags {list(value)}') from None
+    return result
+
+
+_DECODERS['M'] = deserialize_item
+
+
+def serialize(value):
+    """
+    Converts a Python value to a DynamoDB attribute value (the inverse of deserialize()).
+
+    Floats are sent as their decimal string; sets must be non-empty and homogeneous.
+    """
+    if value is None:
+        return {'NULL': True}
+    if isinstance(value, bool):
+        return {'BOOL': value}
+    if isinstance(value, str):
+        return {'S': value}
+    if isinstance(value, (int, float, Decimal)):
+        return {'N': str(value)}
+    if isinstance(value, (bytes, bytearray)):
+        return {'B': bytes(value)}
+    if isinstance(value, dict):
+        return {'M': serialize_item(value)}
+    if isinstance(value, (list, tuple)):
+        return {'L': [serialize(element) for element in value]}
+    if isinstance(value, (set, frozenset)):
+        if all(isinstance(element, str) for element in value):
+            return {'SS': list(value)}
+        if all(isinstance(element, (bytes, bytearray)) for element in value):
+            return {'BS': [bytes(element) for element in value]}
+        return {'NS': [str(element) for element in value]}
+    raise TypeError(f'Type {type(value).__name__} cannot be stored in DynamoDB')
+
+
+def serialize_item(item):
+    """Converts a plain dict to a DynamoDB item."""
+    return {key: serialize(value) for key, value in item.items()}
+
+
+class Projection:
+    """
+    A precompiled projection over the attributes of one table.
+
+    Only the listed attributes are decoded; everything else in the item is skipped. The
+    same projection also yields the ProjectionExpression for reads, so DynamoDB does not
+    return attributes the caller will never look at.
+
+    With numbers_as_strings=True, number attributes keep the decimal string DynamoDB
+    returns, for responses whose schema declares them as strings.
+    """
+
+    def __init__(self, *attributes, numbers_as_strings=False):
+        self.attributes = tuple(attributes)
+        self.numbers_as_strings = numbers_as_strings
+        self._names = {f'#p{index}': name for index, name in enumerate(self.attributes)}
+        self.projection_expression = ', '.join(self._names)
+
+    def read_kwargs(self):
+        """Keyword arguments that limit a GetItem/BatchGetItem/Query read to this projection."""
+        return {
+            'ProjectionExpression': self.projection_expression,
+            'ExpressionAttributeNames': dict(self._names),
+        }
+
+    def __call__(self, item):
+        result = {}
+        for name in self.attributes:
+            value = item.get(name)
+            if value is not None:
+                raw = value.get('S')
+                if raw is None and self.numbers_as_strings:
+                    raw = value.get('N')
+                result[name] = raw if raw is not None else deserialize(value)
+        return result
+
+
+def json_default(obj):
+    """json.dumps() fallback for the types produced by deserialize()."""
+    if isinstance(obj, Decimal):
+        return str(obj)
+    if isinstance(obj, (set, frozenset)):
+        return sorted(obj, key=str)
+    if isinstance(obj, (bytes, bytearray)):
+        return base64.b64encode(obj).decode('ascii')
+    raise TypeError(f'Type {type(obj).__name__} not serializable')
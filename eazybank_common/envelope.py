@@ -0,0 +1,56 @@
+"""
+Response envelopes for Bedrock Agent action groups (OpenAPI schema based).
+
+Every action group Lambda answers with the same structure; only the body, the status
+code and the session attributes vary:
+
+    return envelope.response(event, {'message': 'Done'})
+    return envelope.error(event, 400, 'Missing required parameter: phone_no')
+
+Errors use the same envelope with a non-2xx httpStatusCode and a {'message': ...} body,
+which the agent can read and explain to the user (a bare {'statusCode': ...} dict is
+not a valid action group response).
+"""
+import json
+
+from eazybank_common.dynamodb import json_default
+
+MESSAGE_VERSION = '1.0'
+CONTENT_TYPE = 'application/json'
+
+
+def dumps(body):
+    """Serializes a response body; strings are assumed to be JSON already."""
+    if isinstance(body, str):
+        return body
+    return json.dumps(body, default=json_default)
+
+
+def response(event, body, status_code=200, session_attributes=None, prompt_session_attributes=None):
+    """
+    Wraps a body in the envelope expected by the Bedrock Agent. The session attributes
+    of the event are passed back unless replacements are given.
+    """
+    return {
+        'messageVersion': MESSAGE_VERSION,
+        'response': {
+            'actionGroup': event.get('actionGroup'),
+            'apiPath': event.get('apiPath'),
+            'httpMethod': event.get('httpMethod'),
+            'httpStatusCode': status_code,
+            'responseBody': {
+                CONTENT_TYPE: {
+                    'body': dumps(body)
+                }
+            }
+        },
+        'sessionAttributes': event.get('sessionAttributes', {}) if session_attributes is None else session_attributes,
+        'promptSessionAttributes': (
+            event.get('promptSessionAttributes', {}) if prompt_session_attributes is None else prompt_session_attributes
+        )
+    }
+
+
+def error(event, status_code, message):
+    """An error response the agent can parse: the usual envelope with a {'message': ...} body."""
+    return response(event, {'message': message}, status_code=status_code)
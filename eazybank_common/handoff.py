@@ -0,0 +1,179 @@
+"""
+Human-agent handoff records, shared by the SQS publisher and the request tracker.
+
+Every step of the handoff pipeline is idempotent:
+    - The publisher sends to the FIFO queue with a MessageDeduplicationId derived from
+      session_id + timestamp, so retried sends within SQS's five minute deduplication
+      window are dropped by SQS.
+    - The tracker writes the record with a conditional PutItem keyed by session_id and
+      the request time, so redelivered and retried messages do not create further rows
+      (and therefore no further stream INSERTs).
+    - The notifier only pages on INSERT, i.e. on the first write of a request's record.
+
+Request table layout (see human_handoff_agent/human-agent-requests-table.yaml):
+    session_id       S  partition key
+    requested_at     N  sort key, epoch milliseconds of the request
+    status           S  open -> claimed -> closed
+    open_queue       S  'open' while the request is open, removed on claim/close; the
+                        key of the sparse open-requests-index GSI (sort key requested_at)
+    user_message     S
+    history          B  compacted conversation history, or
+    history_ref      S  claim-check reference of a spilled history
+    history_preview  S  the most recent part of the conversation
+eazybank_common.request_queue reads and updates records in this layout.
+
+The conversation history is compacted once, by the publisher (see eazybank_common.payload):
+it travels as a compressed blob (base64 in the SQS message, a binary attribute in
+DynamoDB) or, when too large, as a claim-check reference. Messages and records also carry
+a short preview of the most recent turns, which is all the notification includes.
+"""
+import hashlib
+import math
+import os
+from datetime import datetime, timezone
+
+from botocore.exceptions import ClientError
+
+from eazybank_common import payload
+from eazybank_common.dynamodb import serialize_item
+
+PREVIEW_CHARS = int(os.environ.get('HANDOFF_PREVIEW_CHARS', '1000'))
+
+STATUS_OPEN = 'open'
+STATUS_CLAIMED = 'claimed'
+STATUS_CLOSED = 'closed'
+OPEN_QUEUE = 'open'  # open_queue value of open requests
+OPEN_REQUESTS_INDEX = 'open-requests-index'
+
+# Exclusive upper bound of valid request times (year 10000, the end of datetime's range)
+_MAX_REQUESTED_AT_MS = 253402300800000
+
+# Attributes copied as-is from the message into the record
+FIELDS = ('user_message', 'history_preview', 'history_ref')
+
+
+def dedup_key(session_id, timestamp):
+    """Deterministic SQS MessageDeduplicationId for one handoff request (64 hex characters)."""
+    return hashlib.sha256(f'{session_id}|{timestamp}'.encode('utf-8')).hexdigest()
+
+
+def requested_at_ms(timestamp):
+    """
+    Converts a request timestamp (ISO 8601, or epoch seconds/milliseconds) to epoch
+    milliseconds. Naive ISO timestamps are taken as UTC.
+
+    The result is the record's sort key, so it must be the same on every delivery of a
+    message: timestamps that cannot be parsed raise ValueError instead of falling back
+    to the current time.
+    """
+    try:
+        value = float(timestamp)
+    except (TypeError, ValueError):
+        try:
+            parsed = datetime.fromisoformat(str(timestamp).strip().replace('Z', '+00:00'))
+        except ValueError:
+            raise ValueError(f'Invalid timestamp: {timestamp}') from None
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=timezone.utc)
+        return int(parsed.timestamp() * 1000)
+    if not math.isfinite(value):
+        raise ValueError(f'Invalid timestamp: {timestamp}')
+    value = int(value if value > 1e11 else value * 1000)
+    if not 0 <= value < _MAX_REQUESTED_AT_MS:
+        raise ValueError(f'Invalid timestamp: {timestamp}')
+    return value
+
+
+def to_iso(requested_at):
+    """Formats epoch milliseconds as an ISO 8601 UTC timestamp."""
+    return datetime.fromtimestamp(int(requested_at) / 1000, tz=timezone.utc).isoformat(timespec='milliseconds')
+
+
+def build_message(user_message, conversation_history, session_id, timestamp):
+    """
+    Creates the (JSON-serializable) handoff message with a compacted conversation history.
+    Histories whose blob exceeds the inline limit go to the claim-check store, or lose
+    their oldest turns if no store is configured.
+    """
+    conversation_history = conversation_history or ''
+    message = {
+        'user_message': user_message,
+        'session_id': session_id,
+        'timestamp': timestamp,
+        'history_preview': payload.preview(conversation_history, PREVIEW_CHARS)
+    }
+
+    blob = payload.encode(conversation_history)
+    if len(blob) > payload.INLINE_MAX_BYTES:
+        store = payload.get_store()
+        if store is not None:
+            message['history_ref'] = store.put(f'handoff/{dedup_key(session_id, timestamp)}', blob)
+            return message
+        blob = payload.truncate(conversation_history, payload.INLINE_MAX_BYTES)
+    message['history'] = payload.to_text(blob)
+    return message
+
+
+def build_item(message, fallback_requested_at=None):
+    """
+    Creates the DynamoDB item (in DynamoDB's attribute format) for a handoff message.
+    New requests are open, so they appear in the open-requests-index.
+
+    fallback_requested_at (epoch milliseconds) is used when the message's timestamp is
+    invalid; it must be stable across deliveries, e.g. the SQS SentTimestamp. Without
+    it, an invalid timestamp raises ValueError.
+    """
+    session_id = message.get('session_id')
+    if not session_id:
+        raise ValueError('Handoff message has no session_id')
+    try:
+        requested_at = requested_at_ms(message.get('timestamp'))
+    except ValueError:
+        if fallback_requested_at is None:
+            raise
+        requested_at = int(fallback_requested_at)
+
+    item = {
+        'session_id': session_id,
+        'requested_at': requested_at,
+        'status': STATUS_OPEN,
+        'open_queue': OPEN_QUEUE
+    }
+    item.update((name, message[name]) for name in FIELDS if message.get(name) is not None)
+    if message.get('history') is not None:
+        item['history'] = payload.from_text(message['history'])  # Stored as a binary attribute
+    elif message.get('conversation_history') is not None:
+        # Message written before histories were compacted
+        item['history'] = payload.encode(message['conversation_history'])
+        item['history_preview'] = payload.preview(message['conversation_history'], PREVIEW_CHARS)
+    return serialize_item(item)
+
+
+def read_history(fields):
+    """Returns the full conversation history of a deserialized record or message."""
+    if fields.get('history') is not None:
+        history = fields['history']
+        return payload.decode(payload.from_text(history) if isinstance(history, str) else history)
+    if fields.get('history_ref'):
+        return payload.decode(payload.fetch(fields['history_ref']))
+    return fields.get('conversation_history')
+
+
+def put_item(client, table_name, item):
+    """
+    Writes a handoff item unless the same request (session_id + requested_at) exists.
+
+    Returns True if the item was written and False if it already existed. Other errors
+    (including throttling that outlasted the client's retries) are raised.
+    """
+    try:
+        client.put_item(
+            TableName=table_name,
+            Item=item,
+            ConditionExpression='attribute_not_exists(session_id)'
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return False
+        raise
+    return True
@@ -0,0 +1,148 @@
+"""
+Lightweight hot-path instrumentation for the Lambda handlers.
+
+Timings and counters collected during an invocation are buffered and written once,
+at the end of the invocation, as a single CloudWatch Embedded Metric Format (EMF)
+JSON line. CloudWatch turns that line into metrics without any PutMetricData calls.
+
+Usage:
+    @instrument_handler('account_status')
+    def lambda_handler(event, context):
+        with timed('dynamodb'):
+            ...
+        add_count('response_bytes', len(body), unit='Bytes')
+
+Environment variables:
+    LOG_LEVEL          Handler log level (default INFO). Payload dumps are DEBUG only.
+    METRICS_NAMESPACE  CloudWatch namespace (default EazyBank/AgentVerse).
+    METRICS_ENABLED    Set to false to stop writing EMF lines.
+"""
+import contextvars
+import functools
+import json
+import logging
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+from eazybank_common import bootstrap
+
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+METRICS_NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'EazyBank/AgentVerse')
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+
+# EMF allows at most 100 values per metric in one log line
+_MAX_VALUES_PER_METRIC = 100
+
+_current = contextvars.ContextVar('eazybank_metrics', default=None)
+
+
+def get_logger(name):
+    """Returns a logger at LOG_LEVEL. Outside Lambda, a basic stderr handler is installed."""
+    root = logging.getLogger()
+    if not root.handlers:
+        logging.basicConfig()
+    logger = logging.getLogger(name)
+    logger.setLevel(LOG_LEVEL)
+    return logger
+
+
+class Metrics:
+    """Metric values buffered for one invocation."""
+
+    def __init__(self, service):
+        self.service = service
+        self.values = {}
+        self.units = {}
+        self.properties = {}
+
+    def add(self, name, value, unit):
+        values = self.values.setdefault(name, [])
+        if len(values) < _MAX_VALUES_PER_METRIC:
+            values.append(value)
+        self.units[name] = unit
+
+    def to_emf(self):
+        document = {
+            '_aws': {
+                'Timestamp': int(time.time() * 1000),
+                'CloudWatchMetrics': [{
+                    'Namespace': METRICS_NAMESPACE,
+                    'Dimensions': [['Service']],
+                    'Metrics': [{'Name': name, 'Unit': self.units[name]} for name in self.values],
+                }],
+            },
+            'Service': self.service,
+        }
+        document.update(self.properties)
+        for name, values in self.values.items():
+            document[name] = values[0] if len(values) == 1 else values
+        return json.dumps(document, separators=(',', ':'))
+
+
+@contextmanager
+def timed(stage):
+    """Records the wall time of the enclosed block as the '<stage>Ms' metric."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.add(f'{stage}Ms', round((time.perf_counter() - started) * 1000, 3), 'Milliseconds')
+
+
+def add_count(name, value=1, unit='Count'):
+    """Records a counter (e.g. payload bytes, records processed) for this invocation."""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.add(name, value, unit)
+
+
+def set_property(name, value):
+    """Attaches a searchable, non-metric field (e.g. a request ID) to the EMF line."""
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.properties[name] = value
+
+
+def log_payload(logger, label, payload):
+    """Logs a full payload at DEBUG level, serializing it only when DEBUG is enabled."""
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug('%s: %s', label, json.dumps(payload, default=str))
+
+
+def instrument_handler(service):
+    """
+    Decorates a Lambda handler: detects cold starts, times the whole invocation and
+    flushes the buffered metrics as one EMF line when the handler returns or raises.
+    """
+    def decorator(handler):
+        logger = get_logger(service)
+
+        @functools.wraps(handler)
+        def wrapper(event, context):
+            metrics = Metrics(service)
+            token = _current.set(metrics)
+            cold_start = bootstrap.is_cold_start()
+            if cold_start:
+                logger.info('Cold start: %s', json.dumps(bootstrap.init_report()))
+            metrics.add('ColdStart', 1 if cold_start else 0, 'Count')
+            if context is not None and getattr(context, 'aws_request_id', None):
+                metrics.properties['RequestId'] = context.aws_request_id
+
+            started = time.perf_counter()
+            try:
+                return handler(event, context)
+            except Exception:
+                metrics.add('Errors', 1, 'Count')
+                raise
+            finally:
+                metrics.add('HandlerMs', round((time.perf_counter() - started) * 1000, 3), 'Milliseconds')
+                _current.reset(token)
+                if METRICS_ENABLED:
+                    sys.stdout.write(metrics.to_emf() + '\n')
+
+        return wrapper
+    return decorator
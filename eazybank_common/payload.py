@@ -0,0 +1,195 @@
+"""
+Compact encoding for large text payloads (the conversation history of a handoff).
+
+encode() compresses text behind a 4-byte header (magic 'EZ', format version, codec),
+so any reader can tell how a blob was written:
+
+    blob = encode(history)          # bytes, stored as a DynamoDB binary attribute
+    text = to_text(blob)            # base64, for JSON bodies such as SQS messages
+    history = decode(from_text(text))
+
+Blobs larger than PAYLOAD_INLINE_MAX_BYTES are spilled to a claim-check store and only
+a reference travels through the pipeline. The store is chosen with CLAIM_CHECK_URL:
+    file:///tmp/claim-check       LocalFileStore (tests and local runs)
+    s3://bucket/prefix            S3Store
+Without a store, oversized histories keep their most recent part.
+
+Environment variables:
+    PAYLOAD_CODEC               zlib (default), zstd or none. zstd needs the optional
+                                'zstandard' package and falls back to zlib without it.
+    PAYLOAD_COMPRESS_MIN_BYTES  Smaller payloads are stored uncompressed (default 512).
+    PAYLOAD_INLINE_MAX_BYTES    Largest blob kept inline (default 150 KB, which stays
+                                under the 256 KB SQS/SNS limit after base64).
+    CLAIM_CHECK_URL             Claim-check store for larger blobs (default: none).
+"""
+from abc import ABC, abstractmethod
+import base64
+import os
+import zlib
+from urllib.parse import urlparse
+
+from eazybank_common import bootstrap
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+MAGIC = b'EZ'
+FORMAT_VERSION = 1
+CODEC_NONE = 0
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+_CODECS = {'none': CODEC_NONE, 'zlib': CODEC_ZLIB, 'zstd': CODEC_ZSTD}
+
+CODEC = _CODECS.get(os.environ.get('PAYLOAD_CODEC', 'zlib').lower(), CODEC_ZLIB)
+if CODEC == CODEC_ZSTD and zstandard is None:
+    CODEC = CODEC_ZLIB
+COMPRESS_MIN_BYTES = int(os.environ.get('PAYLOAD_COMPRESS_MIN_BYTES', '512'))
+INLINE_MAX_BYTES = int(os.environ.get('PAYLOAD_INLINE_MAX_BYTES', str(150 * 1024)))
+CLAIM_CHECK_URL = os.environ.get('CLAIM_CHECK_URL')
+
+TRUNCATION_MARKER = '[... earlier conversation truncated ...]\n'
+
+
+def encode(text, codec=None):
+    """Encodes text as header + (optionally compressed) UTF-8."""
+    raw = text.encode('utf-8')
+    codec = CODEC if codec is None else codec
+    if len(raw) < COMPRESS_MIN_BYTES:
+        codec = CODEC_NONE
+    if codec == CODEC_ZLIB:
+        body = zlib.compress(raw, 6)
+    elif codec == CODEC_ZSTD:
+        body = zstandard.ZstdCompressor(level=3).compress(raw)
+    else:
+        body = raw
+    if codec != CODEC_NONE and len(body) >= len(raw):
+        codec, body = CODEC_NONE, raw  # Not worth it (e.g. short or already compressed text)
+    return MAGIC + bytes((FORMAT_VERSION, codec)) + body
+
+
+def decode(blob):
+    """Decodes a blob written by encode(). Plain strings and headerless bytes are returned as text."""
+    if blob is None or isinstance(blob, str):
+        return blob
+    blob = bytes(blob)
+    if blob[:2] != MAGIC:
+        return blob.decode('utf-8')
+    version, codec = blob[2], blob[3]
+    if version != FORMAT_VERSION:
+        raise ValueError(f'Unsupported payload format version {version}')
+    body = blob[4:]
+    if codec == CODEC_ZLIB:
+        body = zlib.decompress(body)
+    elif codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise ValueError('Payload is zstd-compressed but zstandard is not installed')
+        body = zstandard.ZstdDecompressor().decompress(body)
+    elif codec != CODEC_NONE:
+        raise ValueError(f'Unknown payload codec {codec}')
+    return body.decode('utf-8')
+
+
+def to_text(blob):
+    return base64.b64encode(blob).decode('ascii')
+
+
+def from_text(text):
+    return base64.b64decode(text)
+
+
+def preview(text, max_chars):
+    """The most recent max_chars characters of a text, marked if anything was cut."""
+    if not text or len(text) <= max_chars:
+        return text
+    return TRUNCATION_MARKER + text[-max_chars:]
+
+
+def truncate(text, max_bytes):
+    """Drops the oldest part of a text until its encoded blob fits into max_bytes."""
+    keep = len(text)
+    blob = encode(text)
+    while len(blob) > max_bytes and keep > 0:
+        keep //= 2
+        blob = encode(TRUNCATION_MARKER + text[-keep:] if keep else TRUNCATION_MARKER)
+    return blob
+
+
+# --- Claim-check stores ----------------------------------------------------------------
+
+class ClaimCheckStore(ABC):
+    """Stores blobs too large to travel inline. put() returns a reference for get()."""
+
+    @abstractmethod
+    def put(self, key, blob):
+        """Stores a blob under key and returns its reference."""
+
+    @abstractmethod
+    def get(self, ref):
+        """Returns the blob a reference from put() points to."""
+
+
+class LocalFileStore(ClaimCheckStore):
+    """Keeps blobs as files in a local directory (tests, the load harness, local runs)."""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def put(self, key, blob):
+        path = os.path.join(self.directory, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(blob)
+        return 'file://' + path
+
+    def get(self, ref):
+        with open(urlparse(ref).path, 'rb') as f:
+            return f.read()
+
+
+class S3Store(ClaimCheckStore):
+    """Keeps blobs as S3 objects under a prefix (the function needs s3:PutObject/GetObject)."""
+
+    def __init__(self, bucket, prefix=''):
+        self.bucket = bucket
+        self.prefix = prefix.strip('/')
+
+    def put(self, key, blob):
+        object_key = f'{self.prefix}/{key}' if self.prefix else key
+        bootstrap.get_client('s3').put_object(Bucket=self.bucket, Key=object_key, Body=blob)
+        return f's3://{self.bucket}/{object_key}'
+
+    def get(self, ref):
+        parsed = urlparse(ref)
+        response = bootstrap.get_client('s3').get_object(Bucket=parsed.netloc, Key=parsed.path.lstrip('/'))
+        return response['Body'].read()
+
+
+def store_for(url):
+    """Creates the claim-check store for a file:// or s3:// URL."""
+    parsed = urlparse(url)
+    if parsed.scheme == 'file':
+        return LocalFileStore(parsed.path)
+    if parsed.scheme == 's3':
+        return S3Store(parsed.netloc, parsed.path)
+    raise ValueError(f'Unsupported claim-check URL: {url}')
+
+
+_store = store_for(CLAIM_CHECK_URL) if CLAIM_CHECK_URL else None
+
+
+def get_store():
+    """The configured claim-check store, or None."""
+    return _store
+
+
+def set_store(store):
+    """Installs a claim-check store (e.g. a LocalFileStore for load tests)."""
+    global _store
+    _store = store
+
+
+def fetch(ref):
+    """Loads a spilled blob from the store its reference points to."""
+    return store_for(ref).get(ref)
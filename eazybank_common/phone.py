@@ -0,0 +1,104 @@
+"""
+Phone number normalization and the membership filter of known application numbers.
+
+Numbers arrive as typed by the user ("(201) 616-6576", "+1 201 616 6576"). normalize()
+reduces them to the digits stored as the applications table key and rejects anything
+that cannot be a valid key, before any DynamoDB call.
+
+might_exist() checks a normalized number against a Bloom filter of the phone numbers
+in the applications table, built offline by account_status_agent/build_phone_filter.py.
+A definite miss means the number was not in the table when the filter was built, so
+the filter must be rebuilt as applications are added; a filter older than
+PHONE_FILTER_MAX_AGE_SECONDS is ignored. Without a filter every number "might exist".
+"""
+import logging
+import os
+import re
+import time
+
+from eazybank_common import payload
+from eazybank_common.bloom import BloomFilter
+
+logger = logging.getLogger(__name__)
+
+# Valid normalized numbers; the default accepts 10-digit national numbers
+PHONE_PATTERN = re.compile(os.environ.get('PHONE_PATTERN', r'[1-9]\d{9}'))
+# Country code dropped from international input ("+1 201...", "1-201-...")
+COUNTRY_CODE = os.environ.get('PHONE_COUNTRY_CODE', '1')
+
+# A local path, file:// or s3:// URL of the filter; unset disables the filter
+FILTER_PATH = os.environ.get('PHONE_FILTER_PATH')
+FILTER_REFRESH_SECONDS = float(os.environ.get('PHONE_FILTER_REFRESH_SECONDS', '300'))
+FILTER_MAX_AGE_SECONDS = float(os.environ.get('PHONE_FILTER_MAX_AGE_SECONDS', str(24 * 3600)))
+
+_SEPARATORS = re.compile(r'[\s\-.()/]')
+
+
+class InvalidPhoneNumber(ValueError):
+    """Raised for input that is not a valid phone number."""
+
+
+def normalize(value):
+    """Returns the digits of a phone number as stored in the table, or raises InvalidPhoneNumber."""
+    number = _SEPARATORS.sub('', str(value if value is not None else ''))
+    international = number.startswith('+')
+    number = number.lstrip('+')
+    if COUNTRY_CODE and number.startswith(COUNTRY_CODE) and (international or not PHONE_PATTERN.fullmatch(number)):
+        number = number[len(COUNTRY_CODE):]
+    if not PHONE_PATTERN.fullmatch(number):
+        raise InvalidPhoneNumber(f'Invalid phone number: {value}')
+    return number
+
+
+_filter = None
+_loaded_at = None  # time.monotonic() of the last load attempt
+
+
+def _read(location):
+    if location.startswith(('s3://', 'file://')):
+        return payload.store_for(location).get(location)
+    with open(location, 'rb') as f:
+        return f.read()
+
+
+def _is_stale(bloom_filter):
+    return FILTER_MAX_AGE_SECONDS > 0 and time.time() - bloom_filter.built_at > FILTER_MAX_AGE_SECONDS
+
+
+def load_filter(location=None):
+    """(Re)loads the filter. A failed load keeps the previous filter, if any."""
+    global _filter, _loaded_at
+    location = location or FILTER_PATH
+    _loaded_at = time.monotonic()
+    if not location:
+        return None
+    try:
+        _filter = BloomFilter.from_bytes(_read(location))
+        logger.info("Loaded phone filter with %s numbers from %s", len(_filter), location)
+        if _is_stale(_filter):
+            logger.warning("Phone filter from %s is older than %ss, not using it", location, FILTER_MAX_AGE_SECONDS)
+    except Exception as e:
+        logger.warning("Could not load phone filter from %s: %s", location, e)
+    return _filter
+
+
+def get_filter():
+    """The current filter (reloaded every FILTER_REFRESH_SECONDS), or None if there is no usable one."""
+    if _loaded_at is None or (FILTER_REFRESH_SECONDS > 0 and time.monotonic() - _loaded_at > FILTER_REFRESH_SECONDS):
+        load_filter()
+    if _filter is None or _is_stale(_filter):
+        return None
+    return _filter
+
+
+def set_filter(bloom_filter):
+    """Installs a filter directly (e.g. for load tests); a refresh from PHONE_FILTER_PATH replaces it."""
+    global _filter, _loaded_at
+    _filter = bloom_filter
+    _loaded_at = time.monotonic()
+
+
+def might_exist(phone_no):
+    """False if the normalized number is definitely not in the applications table."""
+    bloom_filter = get_filter()
+    return bloom_filter is None or phone_no in bloom_filter
@@ -0,0 +1,62 @@
+"""
+Precompiled rejection-reason index: ErrorCode -> explanation.
+
+The index is built offline from the ErrorCode policy PDF
+(rejection_reason_agent/build_error_code_index.py) and loaded once per container.
+Lookups are a single dict access on a normalized key, so 'InvalidAddressProof',
+'invalid address proof' and 'ErrorCode - InvalidAddressProof' all match.
+"""
+import json
+import os
+import re
+
+INDEX_PATH = os.environ.get(
+    'REJECTION_INDEX_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'error_code_index.json')
+)
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]')
+_index = None
+
+
+def normalize(code):
+    """Lowercases and strips punctuation, spaces and a leading 'ErrorCode' label."""
+    key = _NON_ALNUM.sub('', str(code).lower())
+    if key.startswith('errorcode'):
+        key = key[len('errorcode'):]
+    return key
+
+
+def _load():
+    global _index
+    if _index is None:
+        with open(INDEX_PATH, encoding='utf-8') as f:
+            error_codes = json.load(f)['error_codes']
+        _index = {normalize(code): (code, explanation) for code, explanation in error_codes.items()}
+    return _index
+
+
+def lookup(code):
+    """Returns (error code, explanation) for a known error code, or None."""
+    if not code:
+        return None
+    return _load().get(normalize(code))
+
+
+def find(text):
+    """
+    Like lookup(), but also finds a known error code mentioned inside free text such as
+    a stored rejection reason ("Rejected: ErrorCode - InvalidPhotograph").
+    """
+    match = lookup(text)
+    if match is None and text:
+        key = normalize(text)
+        for code_key, entry in _load().items():
+            if code_key in key:
+                return entry
+    return match
+
+
+def preload():
+    """Loads the index now instead of on first lookup (e.g. from a priming hook)."""
+    _load()
@@ -0,0 +1,144 @@
+"""
+Query API for the human-agent request table, for agent dashboards and tooling.
+
+Every read is a Query (never a Scan), so its cost depends on the page size and not on
+the size of the table:
+
+    requests, next_key = list_open_requests(limit=20)
+    more, next_key = list_open_requests(limit=20, start_key=next_key)
+    history = get_by_session(session_id)
+    if claim_request(session_id, requested_at, agent_id='agent-7'):
+        ...
+    close_request(session_id, requested_at, resolution='Documents re-submitted')
+
+Claiming and closing are conditional updates, so two agents cannot claim the same
+request. Both remove the request from the sparse open-requests-index. See
+eazybank_common.handoff for the table layout.
+"""
+import os
+import time
+
+from botocore.exceptions import ClientError
+
+from eazybank_common import bootstrap
+from eazybank_common.dynamodb import Projection, deserialize_item
+from eazybank_common.handoff import (
+    OPEN_QUEUE, OPEN_REQUESTS_INDEX, STATUS_CLAIMED, STATUS_CLOSED, STATUS_OPEN, to_iso
+)
+
+TABLE_NAME = os.environ.get('DYNAMODB_TABLE_NAME')
+
+# What a dashboard list shows; the (possibly large) history is left out
+SUMMARY = Projection(
+    'session_id', 'requested_at', 'status', 'user_message', 'history_preview', 'history_ref'
+)
+
+
+def _summary(item):
+    record = SUMMARY(item)
+    record['requested_at_iso'] = to_iso(record['requested_at'])
+    return record
+
+
+def list_open_requests(limit=20, start_key=None, table_name=None):
+    """
+    Returns (requests, next_key): up to `limit` open requests, oldest first, and the key
+    to pass as start_key for the next page (None after the last page).
+    """
+    client = bootstrap.get_client('dynamodb')
+    read_kwargs = SUMMARY.read_kwargs()
+    requests = []
+    while len(requests) < limit:
+        kwargs = {
+            'TableName': table_name or TABLE_NAME,
+            'IndexName': OPEN_REQUESTS_INDEX,
+            'KeyConditionExpression': 'open_queue = :open',
+            'ExpressionAttributeValues': {':open': {'S': OPEN_QUEUE}},
+            'ScanIndexForward': True,
+            'Limit': limit - len(requests),
+            'ProjectionExpression': read_kwargs['ProjectionExpression'],
+            'ExpressionAttributeNames': read_kwargs['ExpressionAttributeNames']
+        }
+        if start_key:
+            kwargs['ExclusiveStartKey'] = start_key
+        response = client.query(**kwargs)
+        requests.extend(_summary(item) for item in response.get('Items', []))
+        start_key = response.get('LastEvaluatedKey')
+        if not start_key:
+            break
+    return requests, start_key
+
+
+def get_by_session(session_id, newest_first=True, table_name=None):
+    """Returns all requests of a session (full records, including the history attributes)."""
+    client = bootstrap.get_client('dynamodb')
+    kwargs = {
+        'TableName': table_name or TABLE_NAME,
+        'KeyConditionExpression': 'session_id = :session_id',
+        'ExpressionAttributeValues': {':session_id': {'S': session_id}},
+        'ScanIndexForward': not newest_first
+    }
+    records = []
+    while True:
+        response = client.query(**kwargs)
+        records.extend(deserialize_item(item) for item in response.get('Items', []))
+        if not response.get('LastEvaluatedKey'):
+            return records
+        kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def _transition(session_id, requested_at, update_expression, condition_expression, values, table_name):
+    try:
+        bootstrap.get_client('dynamodb').update_item(
+            TableName=table_name or TABLE_NAME,
+            Key={'session_id': {'S': session_id}, 'requested_at': {'N': str(int(requested_at))}},
+            UpdateExpression=update_expression,
+            ConditionExpression=condition_expression,
+            ExpressionAttributeNames={'#status': 'status'},
+            ExpressionAttributeValues=values
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return False
+        raise
+    return True
+
+
+def claim_request(session_id, requested_at, agent_id, table_name=None):
+    """
+    Assigns an open request to a human agent. Returns False if the request does not
+    exist or is no longer open (e.g. another agent claimed it first).
+    """
+    return _transition(
+        session_id, requested_at,
+        'SET #status = :claimed, claimed_by = :agent, claimed_at = :now REMOVE open_queue',
+        '#status = :open',
+        {
+            ':claimed': {'S': STATUS_CLAIMED},
+            ':open': {'S': STATUS_OPEN},
+            ':agent': {'S': agent_id},
+            ':now': {'N': str(int(time.time() * 1000))}
+        },
+        table_name
+    )
+
+
+def close_request(session_id, requested_at, resolution=None, table_name=None):
+    """Closes an open or claimed request. Returns False if it does not exist or is already closed."""
+    values = {
+        ':closed': {'S': STATUS_CLOSED},
+        ':open': {'S': STATUS_OPEN},
+        ':claimed': {'S': STATUS_CLAIMED},
+        ':now': {'N': str(int(time.time() * 1000))}
+    }
+    update_expression = 'SET #status = :closed, closed_at = :now'
+    if resolution:
+        update_expression += ', resolution = :resolution'
+        values[':resolution'] = {'S': resolution}
+    return _transition(
+        session_id, requested_at,
+        update_expression + ' REMOVE open_queue',
+        '#status IN (:open, :claimed)',
+        values,
+        table_name
+    )
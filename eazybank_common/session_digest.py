@@ -0,0 +1,155 @@
+"""
+Compact digest of backend results kept in the Bedrock Agent session attributes.
+
+Session attributes are returned with every action group response and passed into the
+next call of the same session, so they can remember what a session already fetched
+across agent turns, even when the next turn lands on a different Lambda container:
+
+    digest = SessionDigest.load(event.get('sessionAttributes'))
+    found, user_details = digest.get_lookup(phone_no)
+    if not found:
+        user_details = get_user_details(phone_no)
+        digest.put_lookup(phone_no, user_details)
+    session_attributes = digest.apply(event.get('sessionAttributes', {}))
+
+The digest is a single JSON string under the 'eazybank_digest' attribute. It is only
+written to the session attributes, never to the prompt session attributes, so it does
+not grow the prompt.
+
+Session attributes are passed to every action group Lambda of the session, so callers
+must only store values that are safe to share, never account or card numbers.
+
+Invalidation rules:
+    - A digest with a different version or that does not parse is ignored as a whole
+      and removed from the session attributes.
+    - Lookups older than SESSION_DIGEST_TTL_SECONDS are dropped, so a status change in
+      DynamoDB is picked up within that time.
+    - A queued handoff is remembered for SESSION_DIGEST_HANDOFF_TTL_SECONDS; after that a
+      new handoff request is sent again.
+    - When the digest exceeds SESSION_DIGEST_MAX_BYTES, the least recently used lookups
+      are dropped until it fits. Set SESSION_DIGEST_MAX_BYTES=0 to disable the digest.
+"""
+import json
+import math
+import os
+import time
+
+from eazybank_common.dynamodb import json_default
+
+ATTRIBUTE = 'eazybank_digest'
+VERSION = 2  # 1 could hold complete application records
+
+MAX_BYTES = int(os.environ.get('SESSION_DIGEST_MAX_BYTES', '2048'))
+TTL_SECONDS = float(os.environ.get('SESSION_DIGEST_TTL_SECONDS', '300'))
+HANDOFF_TTL_SECONDS = float(os.environ.get('SESSION_DIGEST_HANDOFF_TTL_SECONDS', '900'))
+
+
+def _is_timestamp(value):
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value)
+
+
+class SessionDigest:
+    """
+    Lookups (key -> value, where None means "not found") and the handoff marker of one session.
+    Lookups are kept in least recently used order.
+    """
+
+    def __init__(self, lookups=None, handoff=None):
+        self.lookups = lookups if lookups is not None else {}
+        self.handoff = handoff
+        self.changed = False
+
+    @classmethod
+    def load(cls, session_attributes):
+        """Reads the digest from the session attributes; returns an empty digest if absent or stale."""
+        raw = (session_attributes or {}).get(ATTRIBUTE)
+        if MAX_BYTES <= 0 or not raw:
+            return cls()
+        try:
+            data = json.loads(raw)
+            if data.get('v') != VERSION:
+                return cls._discarded()
+            lookups = {key: (stored_at, value) for key, (stored_at, value) in data.get('l', {}).items()}
+            handoff = data.get('h')
+            if handoff is not None:
+                stored_at, timestamp = handoff
+                handoff = (stored_at, timestamp)
+            stored_ats = [stored_at for stored_at, _ in lookups.values()]
+            if handoff is not None:
+                stored_ats.append(handoff[0])
+            if not all(_is_timestamp(stored_at) for stored_at in stored_ats):
+                return cls._discarded()
+            digest = cls(lookups, handoff)
+            digest._expire()
+        except (ValueError, TypeError, AttributeError):
+            return cls._discarded()
+        return digest
+
+    @classmethod
+    def _discarded(cls):
+        # An empty digest that replaces (i.e. removes) the unusable one on apply()
+        digest = cls()
+        digest.changed = True
+        return digest
+
+    def _expire(self):
+        now = time.time()
+        for key in [key for key, (stored_at, _) in self.lookups.items() if now - stored_at > TTL_SECONDS]:
+            del self.lookups[key]
+            self.changed = True
+        if self.handoff is not None and now - self.handoff[0] > HANDOFF_TTL_SECONDS:
+            self.handoff = None
+            self.changed = True
+
+    def get_lookup(self, key):
+        """Returns (found, value) like TTLCache.get; a hit becomes the most recently used lookup."""
+        entry = self.lookups.pop(key, None)
+        if entry is None:
+            return False, None
+        self.lookups[key] = entry
+        return True, entry[1]
+
+    def put_lookup(self, key, value):
+        if MAX_BYTES <= 0:
+            return
+        self.lookups.pop(key, None)
+        self.lookups[key] = (int(time.time()), value)
+        self.changed = True
+
+    def handoff_queued(self):
+        """Returns the timestamp of the handoff already queued for this session, or None."""
+        return self.handoff[1] if self.handoff is not None else None
+
+    def mark_handoff(self, timestamp):
+        if MAX_BYTES <= 0:
+            return
+        self.handoff = (int(time.time()), timestamp)
+        self.changed = True
+
+    def dumps(self):
+        """
+        Serializes the digest within the byte budget, dropping the least recently used
+        lookups first. Returns None if nothing is left to store.
+        """
+        while True:
+            data = {'v': VERSION, 'l': {key: list(entry) for key, entry in self.lookups.items()}}
+            if self.handoff is not None:
+                data['h'] = list(self.handoff)
+            raw = json.dumps(data, separators=(',', ':'), default=json_default)
+            if len(raw.encode('utf-8')) <= MAX_BYTES:
+                return raw if self.lookups or self.handoff is not None else None
+            if not self.lookups:
+                return None
+            del self.lookups[next(iter(self.lookups))]
+
+    def apply(self, session_attributes):
+        """Returns a copy of the session attributes carrying this digest (unchanged if nothing changed)."""
+        if not self.changed or MAX_BYTES <= 0:
+            return session_attributes
+        session_attributes = dict(session_attributes or {})
+        raw = self.dumps()
+        if raw is None:
+            session_attributes.pop(ATTRIBUTE, None)
+        else:
+            session_attributes[ATTRIBUTE] = raw
+        return session_attributes
@@ -1,64 +1,177 @@
-import boto3
 import json
 import os
+from concurrent.futures import ThreadPoolExecutor
 
-# Initialize SNS client outside the handler
-sns = boto3.client('sns')
+from eazybank_common import bootstrap, handoff, payload
+from eazybank_common.dynamodb import Projection
+from eazybank_common.instrumentation import add_count, get_logger, instrument_handler, timed
+
+logger = get_logger(__name__)
+
+# The SNS client is created on first use. Adaptive retries slow the client down
+# when SNS starts throttling instead of failing the batch outright.
+PUBLISH_MAX_WORKERS = int(os.environ.get('PUBLISH_MAX_WORKERS', '4'))
+bootstrap.configure_client(
+    'sns',
+    retries={'mode': 'adaptive', 'max_attempts': int(os.environ.get('SNS_MAX_ATTEMPTS', '5'))},
+    max_pool_connections=max(PUBLISH_MAX_WORKERS, 10)
+)
 SNS_TOPIC_ARN = os.environ.get('SNS_TOPIC_ARN')
+SNS_SUBJECT = 'Human Agent Request (via DynamoDB Streams)'
+
+# SNS PublishBatch limits
+PUBLISH_BATCH_MAX_ENTRIES = 10
+PUBLISH_BATCH_MAX_BYTES = 256 * 1024
+
+# Attributes of the human-agent request item that go into the notification. The full
+# conversation stays in the table (or the claim-check store); only a preview is sent.
+NOTIFICATION_FIELDS = Projection(
+    'user_message', 'history_preview', 'history_ref', 'conversation_history', 'session_id', 'requested_at',
+    'timestamp'
+)
+
+
+def collect_notifications(records):
+    """
+    Turns stream records into notifications, returning a list of
+    (message_payload, [sequence numbers]) pairs in stream order.
+
+    Only INSERT pages a human agent: the tracker writes each request once, so the INSERT
+    is its first transition. MODIFY (claim/close) and REMOVE events, and repeated INSERTs
+    of the same session within a batch, do not notify again.
+    """
+    notifications = []
+    notified_requests = set()
+
+    for record in records:
+        # Check the event type (INSERT, MODIFY, REMOVE)
+        event_name = record['eventName']
+
+        if event_name == 'INSERT':  # Process only the first write of a request
+
+            # Extract the new image (the item after the change)
+            new_image = record['dynamodb'].get('NewImage')
+            if not new_image:
+                continue
+
+            # Extract relevant data from the NewImage attribute
+            fields = NOTIFICATION_FIELDS(new_image)
+
+            # Create a message payload
+            conversation_preview = fields.get('history_preview')
+            if conversation_preview is None:
+                # Record written before histories were compacted
+                conversation_preview = payload.preview(fields.get('conversation_history'), handoff.PREVIEW_CHARS)
+            message_payload = {
+                'user_message': fields.get('user_message'),
+                'conversation_preview': conversation_preview,
+                'session_id': fields.get('session_id'),
+                'timestamp': handoff.to_iso(fields['requested_at']) if 'requested_at' in fields else fields.get('timestamp')
+            }
+            if fields.get('history_ref'):
+                message_payload['conversation_ref'] = fields['history_ref']
+
+            # A session can hand off more than once; each request is keyed by its request time
+            request_key = (message_payload['session_id'], fields.get('requested_at', fields.get('timestamp')))
+            if request_key in notified_requests:
+                logger.debug("Request %s of session %s already notified in this batch.", request_key[1], request_key[0])
+                continue
+            notified_requests.add(request_key)
+            notifications.append((message_payload, [record['dynamodb'].get('SequenceNumber')]))
+
+        elif event_name in ('MODIFY', 'REMOVE'):
+            logger.debug("%s event for an existing request. No SNS notification sent.", event_name)
+        else:
+            logger.warning("Unhandled event type: %s", event_name)
+
+    return notifications
+
+
+def build_batches(notifications):
+    """
+    Groups notifications into PublishBatch requests of at most 10 entries and 256 KB.
+    Yields lists of (entry, [sequence numbers]).
+    """
+    batch = []
+    batch_bytes = 0
+    for index, (message_payload, sequence_numbers) in enumerate(notifications):
+        message = json.dumps(message_payload)
+        entry = {'Id': f'n{index}', 'Message': message, 'Subject': SNS_SUBJECT}
+        entry_bytes = len(message.encode('utf-8')) + len(SNS_SUBJECT)
+
+        if batch and (len(batch) == PUBLISH_BATCH_MAX_ENTRIES or batch_bytes + entry_bytes > PUBLISH_BATCH_MAX_BYTES):
+            yield batch
+            batch = []
+            batch_bytes = 0
+        batch.append((entry, sequence_numbers))
+        batch_bytes += entry_bytes
+
+    if batch:
+        yield batch
+
+
+def publish_batch(batch):
+    """Publishes one batch and returns the sequence numbers of the records that failed."""
+    sequence_numbers_by_id = {entry['Id']: sequence_numbers for entry, sequence_numbers in batch}
+    try:
+        response = bootstrap.get_client('sns').publish_batch(
+            TopicArn=SNS_TOPIC_ARN,
+            PublishBatchRequestEntries=[entry for entry, _ in batch]
+        )
+    except Exception as e:
+        logger.error("Error publishing batch to SNS: %s", e)
+        return [number for numbers in sequence_numbers_by_id.values() for number in numbers]
+
+    failed = []
+    for failure in response.get('Failed', []):
+        logger.error("Error publishing notification %s to SNS: %s %s", failure['Id'], failure.get('Code'), failure.get('Message'))
+        failed.extend(sequence_numbers_by_id[failure['Id']])
+
+    logger.info("Successfully published %d messages to SNS topic: %s", len(response.get('Successful', [])), SNS_TOPIC_ARN)
+    return failed
+
 
+@instrument_handler('notification')
 def lambda_handler(event, context):
     """
     This Lambda function is triggered by DynamoDB Streams.
     It processes stream records and publishes relevant data to an SNS topic.
+
+    Notifications are sent with PublishBatch on a bounded thread pool. The function
+    returns a partial batch response, so only the stream records whose notification
+    failed are retried (the event source mapping must enable ReportBatchItemFailures).
     """
-    try:
-        for record in event['Records']:
-            # Check the event type (INSERT, MODIFY, REMOVE)
-            event_name = record['eventName']
-
-            if event_name == 'INSERT' or event_name == 'MODIFY':  # Process only inserts and updates
-
-                # Extract the new image (the item after the change)
-                new_image = record['dynamodb'].get('NewImage')
-
-                if new_image:
-                    # Extract relevant data from the NewImage attribute
-                    user_message = new_image.get('user_message', {}).get('S')
-                    conversation_history = new_image.get('conversation_history', {}).get('S')
-                    session_id = new_image.get('session_id', {}).get('S')
-                    timestamp = new_image.get('timestamp', {}).get('S')
-
-                    # Create a message payload
-                    message_payload = {
-                        'user_message': user_message,
-                        'conversation_history': conversation_history,
-                        'session_id': session_id,
-                        'timestamp': timestamp
-                    }
-
-                    # Publish the message to SNS
-                    sns.publish(
-                        TopicArn=SNS_TOPIC_ARN,
-                        Message=json.dumps(message_payload),
-                        Subject='Human Agent Request (via DynamoDB Streams)'
-                    )
-
-                    print(f"Successfully published message to SNS topic: {SNS_TOPIC_ARN}")
-
-            elif event_name == 'REMOVE':
-                # Optional: Handle delete events if needed
-                print("Item removed from DynamoDB.  No SNS notification sent.")
-            else:
-                print(f"Unhandled event type: {event_name}")
+    failed_sequence_numbers = []
+    add_count('Records', len(event['Records']))
 
+    try:
+        with timed('Parse'):
+            notifications = collect_notifications(event['Records'])
+    except Exception as e:
+        logger.error("Error processing DynamoDB stream record: %s", e)
+        # Without a usable batch, retry everything from the first record
         return {
-            'statusCode': 200,
-            'body': json.dumps('Successfully processed DynamoDB stream records and published to SNS.')
+            'batchItemFailures': [{'itemIdentifier': record['dynamodb']['SequenceNumber']} for record in event['Records'][:1]]
         }
 
-    except Exception as e:
-        print(f"Error processing DynamoDB stream record: {e}")
-        return {
-            'statusCode': 500,
-            'body': json.dumps(f'Error processing DynamoDB stream record: {e}')
-        }
\ No newline at end of file
+    with timed('Serialize'):
+        batches = list(build_batches(notifications))
+    add_count('Notifications', len(notifications))
+    add_count('MessageBytes', sum(len(entry['Message']) for batch in batches for entry, _ in batch), unit='Bytes')
+
+    with timed('SNS'):
+        if len(batches) == 1:
+            failed_sequence_numbers.extend(publish_batch(batches[0]))
+        elif batches:
+            with ThreadPoolExecutor(max_workers=PUBLISH_MAX_WORKERS) as executor:
+                for failed in executor.map(publish_batch, batches):
+                    failed_sequence_numbers.extend(failed)
+    add_count('FailedRecords', len(failed_sequence_numbers))
+
+    return {
+        'batchItemFailures': [{'itemIdentifier': number} for number in failed_sequence_numbers]
+    }
+
+
+bootstrap.register_priming_hook(lambda: bootstrap.get_client('sns'))
+bootstrap.prime_on_init()
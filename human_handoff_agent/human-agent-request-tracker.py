@@ -1,53 +1,115 @@
-import boto3
+import contextvars
 import json
-import uuid
 import os
+from concurrent.futures import ThreadPoolExecutor
+
+from eazybank_common import bootstrap, handoff
+from eazybank_common.instrumentation import add_count, get_logger, instrument_handler, timed
+
+logger = get_logger(__name__)
 
-# Initialize AWS resources outside the handler for reuse
-dynamodb = boto3.resource('dynamodb')
 TABLE_NAME = os.environ.get('DYNAMODB_TABLE_NAME')  # Read table name from environment variable
-table = dynamodb.Table(TABLE_NAME)
 
+# Conditional writes cannot go through BatchWriteItem, so records are written with
+# PutItem on a bounded thread pool. The DynamoDB client is created on first use and
+# reused across invocations; adaptive retries back off when DynamoDB throttles.
+PUT_MAX_WORKERS = int(os.environ.get('PUT_MAX_WORKERS', '8'))
+CLIENT_NAME = 'request_tracker'
+bootstrap.configure_client(
+    'dynamodb',
+    name=CLIENT_NAME,
+    retries={'mode': 'adaptive', 'max_attempts': int(os.environ.get('DYNAMODB_MAX_ATTEMPTS', '5'))},
+    max_pool_connections=max(PUT_MAX_WORKERS, 10)
+)
+
+
+def build_item(record):
+    """
+    Creates the DynamoDB item (in DynamoDB's attribute format) for one SQS record.
+    Messages with an invalid timestamp (sent before the publisher validated them) are
+    keyed by the time SQS received them, which is the same on every redelivery.
+    """
+    message_body = json.loads(record['body'])  # Parse the SQS message body
+    return handoff.build_item(message_body, (record.get('attributes') or {}).get('SentTimestamp'))
+
+
+def store_item(pending):
+    """
+    Writes one (message_id, item) pair. Returns (message_id, written, error) where
+    written is False if the request was already stored.
+    """
+    message_id, item = pending
+    try:
+        with timed('DynamoDB'):
+            written = handoff.put_item(bootstrap.get_client('dynamodb', name=CLIENT_NAME), TABLE_NAME, item)
+    except Exception as e:
+        logger.error("Error storing message %s in DynamoDB: %s", message_id, e)
+        return message_id, False, e
+    if written:
+        logger.debug("Successfully processed message %s and stored in DynamoDB for session %s", message_id, item['session_id']['S'])
+    else:
+        logger.info("Request for session %s already stored, skipping message %s", item['session_id']['S'], message_id)
+    return message_id, written, None
+
+
+@instrument_handler('request_tracker')
 def lambda_handler(event, context):
     """
     This Lambda function processes messages from an SQS queue, stores the data
     in a DynamoDB table.
+
+    Each request is stored once: records are written with a conditional PutItem keyed
+    by session_id and request time, and a record that already exists counts as stored.
+    The function returns a partial batch response, so only the messages that could not
+    be stored are redelivered (the event source mapping must enable
+    ReportBatchItemFailures).
     """
-    try:
-        for record in event['Records']:
-            message_body = json.loads(record['body'])  # Parse the SQS message body
+    if not TABLE_NAME:
+        logger.error("DYNAMODB_TABLE_NAME environment variable not set.")
+        return {
+            'batchItemFailures': [{'itemIdentifier': record['messageId']} for record in event['Records']]
+        }
 
-            # Extract data from the message
-            user_message = message_body.get('user_message')
-            conversation_history = message_body.get('conversation_history')
-            session_id = message_body.get('session_id')
-            timestamp = message_body.get('timestamp')
+    failed_message_ids = []
+    pending = []
 
-            # Generate a UUID for the DynamoDB partition key
-            item_id = str(uuid.uuid4())
+    add_count('Records', len(event['Records']))
+    add_count('MessageBytes', sum(len(record.get('body') or '') for record in event['Records']), unit='Bytes')
+    with timed('Parse'):
+        for record in event['Records']:
+            try:
+                pending.append((record['messageId'], build_item(record)))
+            except Exception as e:
+                logger.error("Error processing SQS message %s: %s", record.get('messageId'), e)
+                failed_message_ids.append(record.get('messageId'))
 
-            # Create the DynamoDB item
-            item = {
-                'id': item_id,  # Partition key
-                'user_message': user_message,
-                'conversation_history': conversation_history,
-                'session_id': session_id,
-                'timestamp': timestamp
-            }
+    if len(pending) == 1:
+        results = [store_item(pending[0])]
+    else:
+        # Worker threads do not inherit context variables; run each write in a copy of
+        # this context so its timings land in this invocation's metrics
+        with ThreadPoolExecutor(max_workers=PUT_MAX_WORKERS) as executor:
+            futures = [executor.submit(contextvars.copy_context().run, store_item, item) for item in pending]
+            results = [future.result() for future in futures]
 
-            # Write the item to DynamoDB
-            table.put_item(Item=item)
+    duplicates = 0
+    for message_id, written, error in results:
+        if error is not None:
+            failed_message_ids.append(message_id)
+        elif not written:
+            duplicates += 1
 
-            print(f"Successfully processed message and stored in DynamoDB with ID: {item_id}")
+    add_count('Duplicates', duplicates)
+    add_count('FailedRecords', len(failed_message_ids))
+    if failed_message_ids:
+        logger.warning("%d of %d SQS messages will be redelivered", len(failed_message_ids), len(event['Records']))
+    else:
+        logger.info("Successfully processed %d SQS messages (%d duplicates), and stored in DynamoDB", len(pending), duplicates)
 
-        return {
-            'statusCode': 200,
-            'body': json.dumps('Successfully processed SQS messages, and stored in DynamoDB')
-        }
+    return {
+        'batchItemFailures': [{'itemIdentifier': message_id} for message_id in failed_message_ids]
+    }
 
-    except Exception as e:
-        print(f"Error processing SQS message: {e}")
-        return {
-            'statusCode': 500,
-            'body': json.dumps(f'Error processing SQS message: {e}')
-        }
+
+bootstrap.register_priming_hook(lambda: bootstrap.get_client('dynamodb', name=CLIENT_NAME))
+bootstrap.prime_on_init()
@@ -1,10 +1,56 @@
 import json
-import boto3
 import os
 
+from eazybank_common import bootstrap, envelope, handoff
+from eazybank_common.instrumentation import add_count, get_logger, instrument_handler, log_payload, timed
+from eazybank_common.session_digest import SessionDigest
+
+logger = get_logger(__name__)
+
+# 'queue' sends every handoff request through SQS to the request tracker. 'fast' writes
+# the tracker record directly (the notifier still fires from the table's stream) and
+# only sends to SQS when that write fails, e.g. because DynamoDB throttles.
+HANDOFF_MODE = os.environ.get('HANDOFF_MODE', 'queue').lower()
+TABLE_NAME = os.environ.get('DYNAMODB_TABLE_NAME')
+CLIENT_NAME = 'handoff_fast_path'
+if HANDOFF_MODE == 'fast':
+    if not TABLE_NAME:
+        logger.warning("HANDOFF_MODE is fast but DYNAMODB_TABLE_NAME is not set, using the queue.")
+        HANDOFF_MODE = 'queue'
+    # Fail over to SQS quickly rather than retrying a throttled table. The client has its
+    # own name so these settings do not apply to other handlers in the same container.
+    bootstrap.configure_client(
+        'dynamodb',
+        name=CLIENT_NAME,
+        retries={'mode': 'standard', 'max_attempts': int(os.environ.get('FAST_PATH_MAX_ATTEMPTS', '2'))},
+        connect_timeout=2,
+        read_timeout=2
+    )
+
+
+def write_record(message):
+    """
+    Fast path: writes the request record the tracker would have written.
+    Returns True if it was written, False if the session's request already exists, or
+    None if the write failed and the message has to go through SQS instead.
+    """
+    try:
+        with timed('DynamoDB'):
+            return handoff.put_item(bootstrap.get_client('dynamodb', name=CLIENT_NAME), TABLE_NAME, handoff.build_item(message))
+    except Exception as e:
+        logger.warning("Fast path write for session %s failed, falling back to SQS: %s", message.get('session_id'), e)
+        add_count('FastPathFallbacks')
+        return None
+
+
+@instrument_handler('publish_to_sqs')
 def lambda_handler(event, context):
     """
-    Handles requests, extracts data, sends to SQS, constructs a detailed response, and *explicitly logs the response*.
+    Handles requests, extracts data, sends to SQS and constructs a detailed response.
+    With HANDOFF_MODE=fast the request record is written to DynamoDB directly and SQS
+    is only used as the fallback. A session whose handoff is already queued (per the
+    session digest) is not sent again. The full response is only logged when LOG_LEVEL
+    is DEBUG.
     """
     try:
         # Extract data from the event (passed by Bedrock Agent)
@@ -14,11 +60,8 @@ def lambda_handler(event, context):
             application_json = content.get('application/json', {})
             properties_list = application_json.get('properties', [])
         except (KeyError, TypeError) as e:
-            print(f"Error parsing event structure: {e}")
-            return {
-                'statusCode': 400,
-                'body': json.dumps({'message': 'Invalid request body structure'})
-            }
+            logger.warning("Error parsing event structure: %s", e)
+            return envelope.error(event, 400, 'Invalid request body structure')
 
         # Function to extract value by name
         def get_value(name, properties):
@@ -35,96 +78,84 @@ def lambda_handler(event, context):
 
         # Validate that required fields are present
         if not all([user_message, session_id, timestamp]):
-            print(f"Missing one or more required parameters. Extracted values: user_message={user_message}, session_id={session_id}, timestamp={timestamp}")
-            return {
-                'statusCode': 400,
-                'body': json.dumps({'message': 'Missing required parameters'})
-            }
-
-        # Prepare the message for SQS
-        message = {
-            "user_message": user_message,
-            "conversation_history": conversation_history,
-            "session_id": session_id,
-            "timestamp": timestamp
-        }
-        message_body = json.dumps(message)
-
-        # Initialize SQS client
-        sqs = boto3.client('sqs')
+            logger.warning("Missing one or more required parameters. Extracted values: user_message=%s, session_id=%s, timestamp=%s", user_message, session_id, timestamp)
+            return envelope.error(event, 400, 'Missing required parameters')
+
+        # The timestamp becomes the request record's sort key, so it must parse the same
+        # way on every delivery
+        try:
+            handoff.requested_at_ms(timestamp)
+        except ValueError:
+            logger.warning("Invalid timestamp for session %s: %s", session_id, timestamp)
+            return envelope.error(event, 400, f'Invalid timestamp: {timestamp}')
+
+        digest = SessionDigest.load(event.get('sessionAttributes'))
+        queued_at = digest.handoff_queued()
+        if queued_at is not None:
+            add_count('DigestHits')
+            logger.info("Handoff for session %s already queued at %s, not sending again", session_id, queued_at)
+            return envelope.response(
+                event, {'message': 'Handoff request already queued. A human agent will contact you shortly.'}
+            )
+
+        # Prepare the message for SQS (the conversation history is compressed or spilled)
+        with timed('Serialize'):
+            message = handoff.build_message(user_message, conversation_history, session_id, timestamp)
+            message_body = json.dumps(message)
+        add_count('HistoryBytes', len((conversation_history or '').encode('utf-8')), unit='Bytes')
+        if 'history_ref' in message:
+            add_count('HistoriesSpilled')
+        add_count('MessageBytes', len(message_body), unit='Bytes')
+
+        if HANDOFF_MODE == 'fast':
+            written = write_record(message)
+            if written is not None:
+                if not written:
+                    add_count('Duplicates')
+                digest.mark_handoff(timestamp)
+                logger.info("Stored handoff request for session %s directly in DynamoDB", session_id)
+                return envelope.response(
+                    event, {'message': 'Handoff request stored successfully!'},
+                    session_attributes=digest.apply(event.get('sessionAttributes', {}))
+                )
+
+        # Get the SQS client (created once per container)
+        sqs = bootstrap.get_client('sqs')
 
         # Get the SQS Queue URL from environment variable
         queue_url = os.environ.get('SQS_QUEUE_URL')
 
         if not queue_url:
-            print("SQS_QUEUE_URL environment variable not set.")
-            return {
-                'statusCode': 500,
-                'body': json.dumps({'message': 'SQS Queue URL not configured'})
-            }
+            logger.error("SQS_QUEUE_URL environment variable not set.")
+            return envelope.error(event, 500, 'SQS Queue URL not configured')
 
         # Send message to SQS FIFO queue
-        response = sqs.send_message(
-            QueueUrl=queue_url,
-            MessageBody=message_body,
-            MessageGroupId=session_id  # Required for FIFO queues.  Crucially, use session_id for grouping.
-            # MessageDeduplicationId=  # Only required if content-based deduplication is disabled
+        with timed('SQS'):
+            response = sqs.send_message(
+                QueueUrl=queue_url,
+                MessageBody=message_body,
+                MessageGroupId=session_id,  # Required for FIFO queues.  Crucially, use session_id for grouping.
+                MessageDeduplicationId=handoff.dedup_key(session_id, timestamp)  # Retried sends are dropped by SQS
+            )
+
+        # Remember the queued handoff for later turns of this session
+        digest.mark_handoff(timestamp)
+        api_response = envelope.response(
+            event, {'message': 'Data sent to SQS successfully!'},
+            session_attributes=digest.apply(event.get('sessionAttributes', {}))
         )
 
-        # Construct the response body as a dictionary
-        response_body_content = {
-            'message': 'Data sent to SQS successfully!'
-        }
-
-        action_response = {
-            'actionGroup': event['actionGroup'],
-            'apiPath': event['apiPath'],
-            'httpMethod': event['httpMethod'],
-            'httpStatusCode': 200,
-            'responseBody': {
-                'application/json': {
-                    'body': json.dumps(response_body_content)
-                }
-            }
-        }
-
-        session_attributes = event.get('sessionAttributes', {})
-        prompt_session_attributes = event.get('promptSessionAttributes', {})
-
-        api_response = {
-            'messageVersion': '1.0',
-            'response': action_response,
-            'sessionAttributes': session_attributes,
-            'promptSessionAttributes': prompt_session_attributes
-        }
-
-        print(f"Lambda Response (final): {json.dumps(api_response)}")
+        logger.info("Sent handoff request for session %s to SQS with message ID: %s", session_id, response.get('MessageId'))
+        log_payload(logger, "Lambda Response (final)", api_response)
         return api_response
 
 
     except Exception as e:
-        print(f"Error processing request: {e}")
-        error_response_body = {'message': f'Error processing request: {str(e)}'}
-
-        action_response = {
-            'actionGroup': event['actionGroup'],
-            'apiPath': event['apiPath'],
-            'httpMethod': event['httpMethod'],
-            'httpStatusCode': 500,
-            'responseBody': {
-                'application/json': {
-                    'body': json.dumps(error_response_body)
-                }
-            }
-        }
-
-        session_attributes = event.get('sessionAttributes', {})
-        prompt_session_attributes = event.get('promptSessionAttributes', {})
-
-        api_response = {
-            'messageVersion': '1.0',
-            'response': action_response,
-            'sessionAttributes': session_attributes,
-            'promptSessionAttributes': prompt_session_attributes
-        }
-        return api_response
+        logger.error("Error processing request: %s", e)
+        return envelope.error(event, 500, f'Error processing request: {str(e)}')
+
+
+bootstrap.register_priming_hook(lambda: bootstrap.get_client('sqs'))
+if HANDOFF_MODE == 'fast':
+    bootstrap.register_priming_hook(lambda: bootstrap.get_client('dynamodb', name=CLIENT_NAME))
+bootstrap.prime_on_init()
@@ -3,12 +3,14 @@ import json
 import logging
 import logging.config
 import os
-import re
 from services import bedrock_agent_runtime
+from services.intent_router import IntentRouter
+from services.message_store import MessageStore
+from services.trace_analysis import WaterfallRecorder
+from services.trace_store import TraceStore
 import streamlit as st
 import uuid
 import yaml
-from datetime import datetime
 
 load_dotenv()
 
@@ -73,103 +75,106 @@ st.markdown(
 # --- App Initialization ---
 def init_session_state():
     st.session_state.session_id = str(uuid.uuid4())
-    st.session_state.messages = []
-    st.session_state.citations = []
-    st.session_state.trace = {}
+    st.session_state.messages = MessageStore()
+    st.session_state.trace_store = TraceStore()
+    st.session_state.intent_router = IntentRouter()
 
 if len(st.session_state.items()) == 0:
     init_session_state()
 
-# --- Variable Definitions (MISSING BEFORE) ---
-trace_types_map = {
-    "Pre-Processing": ["preGuardrailTrace", "preProcessingTrace"],
-    "Orchestration": ["orchestrationTrace"],
-    "Post-Processing": ["postProcessingTrace", "postGuardrailTrace"]
-}
-
-trace_info_types_map = {
-    "preProcessingTrace": ["modelInvocationInput", "modelInvocationOutput"],
-    "orchestrationTrace": ["invocationInput", "modelInvocationInput", "modelInvocationOutput", "observation", "rationale"],
-    "postProcessingTrace": ["modelInvocationInput", "modelInvocationOutput", "observation"]
-}
-
-# JSON Serializer function
-def json_serial(obj):
-    """JSON serializer for objects not serializable by default json code"""
-    if isinstance(obj, (datetime)):
-        return obj.isoformat()
-    raise TypeError ("Type %s not serializable" % type(obj))
-
 # --- Sidebar ---
+def render_turn_timeline(turn):
+    """Compact per-hop latency waterfall of a turn (model calls, action groups, knowledge bases, collaborators)."""
+    if turn.waterfall is None or not turn.waterfall.spans:
+        st.text("None")
+        return
+    st.caption(turn.waterfall.summary())
+    st.code(turn.waterfall.timeline(), language=None)
+
+
+def render_turn_trace(turn):
+    """Shows one page of a turn's trace steps. JSON is only built when a step is opened."""
+    if not turn.steps:
+        st.text("None")
+        return
+
+    page = 1
+    if turn.page_count() > 1:
+        page = st.number_input("Page", min_value=1, max_value=turn.page_count(), value=1, key=f"trace_page_{turn.number}")
+
+    # Show trace steps in JSON similar to the Bedrock console
+    current_header = None
+    for trace_type_header, step_num, traces in turn.steps_page(page - 1):
+        if trace_type_header != current_header:
+            st.subheader(trace_type_header)
+            current_header = trace_type_header
+        with st.expander(f"Trace Step {str(step_num)}", expanded=False):
+            if not st.toggle("Show JSON", key=f"trace_json_{turn.number}_{step_num}"):
+                continue
+            for index, trace in enumerate(traces):
+                try:
+                    trace_str = turn.to_json(("trace", step_num, index), trace)
+                    st.code(trace_str, language="json", line_numbers=True, wrap_lines=True)
+                except TypeError as e:
+                    st.error(f"Error serializing trace: {e}")
+
+
+def render_turn_citations(turn):
+    citation_num = 1
+    for citation_index, citation in enumerate(turn.citations):
+        for retrieved_ref_num, retrieved_ref in enumerate(citation["retrievedReferences"]):
+            with st.expander(f"Citation [{str(citation_num)}]", expanded=False):
+                try:
+                    citation_str = turn.to_json(
+                        ("citation", citation_index, retrieved_ref_num),
+                        {
+                            "generatedResponsePart": citation["generatedResponsePart"],
+                            "retrievedReference": retrieved_ref
+                        }
+                    )
+                    st.code(citation_str, language="json", line_numbers=True, wrap_lines=True)
+                except TypeError as e:
+                    st.error(f"Error serializing citation: {e}")
+            citation_num = citation_num + 1
+    if citation_num == 1:
+        st.text("None")
+
+
 with st.sidebar:
     st.title("Trace")
 
-    # Show each trace type in separate sections
-    step_num = 1
-    for trace_type_header in trace_types_map:
-        st.subheader(trace_type_header)
-
-        # Organize traces by step similar to how it is shown in the Bedrock console
-        has_trace = False
-        for trace_type in trace_types_map[trace_type_header]:
-            if trace_type in st.session_state.trace:
-                has_trace = True
-                trace_steps = {}
-
-                for trace in st.session_state.trace[trace_type]:
-                    # Each trace type and step may have different information for the end-to-end flow
-                    if trace_type in trace_info_types_map:
-                        trace_info_types = trace_info_types_map[trace_type]
-                        for trace_info_type in trace_info_types:
-                            if trace_info_type in trace:
-                                trace_id = trace[trace_info_type]["traceId"]
-                                if trace_id not in trace_steps:
-                                    trace_steps[trace_id] = [trace]
-                                else:
-                                    trace_steps[trace_id].append(trace)
-                                break
-                    else:
-                        trace_id = trace["traceId"]
-                        trace_steps[trace_id] = [
-                            {
-                                trace_type: trace
-                            }
-                        ]
-
-                # Show trace steps in JSON similar to the Bedrock console
-                for trace_id in trace_steps.keys():
-                    with st.expander(f"Trace Step {str(step_num)}", expanded=False):
-                        for trace in trace_steps[trace_id]:
-                            try:
-                                trace_str = json.dumps(trace, indent=2, default=json_serial)  # Use json_serial
-                                st.code(trace_str, language="json", line_numbers=True, wrap_lines=True)
-                            except TypeError as e:
-                                st.error(f"Error serializing trace: {e}")
-                        step_num += 1
-        if not has_trace:
-            st.text("None")
-
-    st.subheader("Citations")
-    if len(st.session_state.citations) > 0:
-        citation_num = 1
-        for citation in st.session_state.citations:
-            for retrieved_ref_num, retrieved_ref in enumerate(citation["retrievedReferences"]):
-                with st.expander(f"Citation [{str(citation_num)}]", expanded=False):
-                    try:
-                        citation_str = json.dumps(
-                            {
-                                "generatedResponsePart": citation["generatedResponsePart"],
-                                "retrievedReference": citation["retrievedReferences"][retrieved_ref_num]
-                            },
-                            indent=2,
-                            default=json_serial  # Use json_serial
-                        )
-                        st.code(citation_str, language="json", line_numbers=True, wrap_lines=True)
-                    except TypeError as e:
-                        st.error(f"Error serializing citation: {e}")
-                    citation_num = citation_num + 1
-    else:
+    intent_router = st.session_state.intent_router
+    if intent_router.enabled and intent_router.turns:
+        st.caption(
+            f"Answered locally: {intent_router.hit_count} of {intent_router.turns} turns ({intent_router.hit_rate:.0%})"
+        )
+
+    trace_store = st.session_state.trace_store
+    if trace_store.latest is None:
+        st.text("None")
+        st.subheader("Citations")
         st.text("None")
+    else:
+        # Traces are grouped once per turn; older turns stay available up to the history limit
+        turn_numbers = [turn.number for turn in reversed(trace_store.turns)]
+        selected_turn = st.selectbox(
+            "Turn",
+            turn_numbers,
+            format_func=lambda number: f"Turn {number}: {trace_store.get(number).prompt[:40]}"
+        )
+        turn = trace_store.get(selected_turn) or trace_store.latest
+        st.subheader("Timeline")
+        render_turn_timeline(turn)
+        st.download_button(
+            "Download timings (JSONL)",
+            data=trace_store.to_jsonl(st.session_state.session_id),
+            file_name=f"agent-timings-{st.session_state.session_id}.jsonl",
+            mime="application/jsonl"
+        )
+        render_turn_trace(turn)
+
+        st.subheader("Citations")
+        render_turn_citations(turn)
 
 # --- Main App UI ---
 st.markdown(
@@ -186,53 +191,66 @@ st.markdown(
     unsafe_allow_html=True,
 )
 
-# Display chat messages from history
-for message in st.session_state.messages:
-    with st.chat_message(message["role"]):
-        st.markdown(message["content"], unsafe_allow_html=True)
+# Display chat messages from history: a summary of older turns, then the recent window
+message_store = st.session_state.messages
+if message_store.summary:
+    with st.expander(f"Earlier conversation ({message_store.folded_count} messages)", expanded=False):
+        st.markdown(message_store.summary)
+for message in message_store:
+    with st.chat_message(message.role):
+        st.markdown(message_store.render(message), unsafe_allow_html=message.unsafe_html)
 
 # Chat input that invokes the agent
 if prompt := st.chat_input():
-    st.session_state.messages.append({"role": "user", "content": prompt})
+    conversation_history = message_store.transcript()
+    message_store.add("user", prompt)
     with st.chat_message("user"):
         st.write(prompt)
 
-    with st.chat_message("assistant"):
-        full_response = ""  # Accumulate the response
+    # Greetings and clear handoff requests can be answered without invoking the agent
+    local_text = st.session_state.intent_router.route(st.session_state.session_id, prompt, conversation_history)
+    if local_text is not None:
+        with st.chat_message("assistant"):
+            message = message_store.add("assistant", local_text)
+            st.markdown(message_store.render(message), unsafe_allow_html=message.unsafe_html)
+    else:
+        with st.chat_message("assistant"):
+            citations = []
+            trace = {}
+            recorder = WaterfallRecorder()
+
+            def stream_text():
+                # Yield response text as it arrives while collecting citations, traces and timings
+                for event in bedrock_agent_runtime.invoke_agent_stream(
+                    agent_id,
+                    agent_alias_id,
+                    st.session_state.session_id,
+                    prompt
+                ):
+                    recorder.add(event)
+                    if event["type"] == "chunk":
+                        yield event["text"]
+                    elif event["type"] == "citations":
+                        citations.extend(event["citations"])
+                    elif event["type"] == "trace":
+                        trace.setdefault(event["trace_type"], []).append(event["trace"])
 
-        with st.spinner():  # Keep the spinner active during the streaming response
-            response = bedrock_agent_runtime.invoke_agent(
-                agent_id,
-                agent_alias_id,
-                st.session_state.session_id,
-                prompt
-            )
-            output_text = response["output_text"]
+            response_placeholder = st.empty()
+            with response_placeholder.container():
+                output_text = st.write_stream(stream_text())
+            if not isinstance(output_text, str):
+                output_text = "".join(str(part) for part in output_text)
 
             # Check if the output is a JSON object with the instruction and result fields
             try:
                 output_json = json.loads(output_text, strict=False)
                 if "instruction" in output_json and "result" in output_json:
                     output_text = output_json["result"]
-            except json.JSONDecodeError as e:
+            except (json.JSONDecodeError, TypeError) as e:
                 pass
 
-            # Add citations
-            if len(response["citations"]) > 0:
-                citation_num = 1
-                output_text = re.sub(r"%\[(\d+)\]%", r"<sup>[\1]</sup>", output_text)
-                num_citation_chars = 0
-                citation_locs = ""
-                for citation in response["citations"]:
-                    for retrieved_ref in citation["retrievedReferences"]:
-                        citation_marker = f"[{citation_num}]"
-                        citation_locs += f"\n<br>{citation_marker} {retrieved_ref['location']['s3Location']['uri']}"
-                        citation_num += 1
-                    output_text += f"\n{citation_locs}"
-
-            full_response += output_text
-
-        st.session_state.messages.append({"role": "assistant", "content": full_response})  # Use accumulated response
-        st.session_state.citations = response["citations"]
-        st.session_state.trace = response["trace"]
-        st.markdown(full_response, unsafe_allow_html=True)  # Display accumulated response
+            # Citations are stored with the message and rendered (once) from there
+            message = message_store.add("assistant", output_text, citations)
+            st.session_state.trace_store.add_turn(prompt, trace, citations, recorder.waterfall())
+            # Replace the raw streamed text once the final response has been post-processed
+            response_placeholder.markdown(message_store.render(message), unsafe_allow_html=message.unsafe_html)
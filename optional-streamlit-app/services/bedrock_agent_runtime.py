@@ -1,51 +1,144 @@
 import boto3
+from botocore.config import Config
 from botocore.exceptions import ClientError
 import logging
+import os
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
-def invoke_agent(agent_id, agent_alias_id, session_id, prompt):
-    try:
-        client = boto3.client(service_name="bedrock-agent-runtime")
+TRACE_TYPES = ["guardrailTrace", "preProcessingTrace", "orchestrationTrace", "postProcessingTrace"]
+
+# One client per process, shared by all Streamlit sessions and threads (boto3 clients are thread-safe)
+_client = None
+_client_lock = threading.Lock()
+
+
+def client_config():
+    """botocore settings for long-lived, streaming agent invocations."""
+    return Config(
+        max_pool_connections=int(os.environ.get("BEDROCK_AGENT_MAX_POOL_CONNECTIONS", "50")),
+        tcp_keepalive=True,
+        connect_timeout=float(os.environ.get("BEDROCK_AGENT_CONNECT_TIMEOUT", "5")),
+        # Orchestration turns can pause for a long time between stream events
+        read_timeout=float(os.environ.get("BEDROCK_AGENT_READ_TIMEOUT", "300")),
+        retries={
+            "mode": "adaptive",
+            "max_attempts": int(os.environ.get("BEDROCK_AGENT_MAX_ATTEMPTS", "4"))
+        }
+    )
+
+
+def get_client():
+    """
+    Returns the process-wide bedrock-agent-runtime client, creating it on first use.
+
+    Reusing the client keeps credential and endpoint resolution and the TLS connection
+    pool alive across chat turns instead of redoing them for every prompt.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = boto3.client(service_name="bedrock-agent-runtime", config=client_config())
+    return _client
+
+
+def set_client(client):
+    """Installs the client to use instead of a real one (e.g. services.fake_agent_runtime for offline runs)."""
+    global _client
+    with _client_lock:
+        _client = client
 
-        response = client.invoke_agent(
-            agentId='JYFK4LXLKS',
-            agentAliasId='GVRAPMGFG2',
+
+def invoke_agent_stream(agent_id, agent_alias_id, session_id, prompt):
+    """
+    Invokes the agent and yields events as they arrive on the completion stream.
+
+    Each event is a dict with a "type" key:
+      - {"type": "chunk", "text": str}: the next piece of the response text
+      - {"type": "citations", "citations": list}: citations attached to the last chunk
+      - {"type": "trace", "trace_type": str, "trace": dict}: a trace step, with guardrail
+        traces mapped to "preGuardrailTrace" or "postGuardrailTrace". Traces of
+        collaborator agents also carry "collaborator_name" and "caller_chain", and
+        "event_time" is the trace's own timestamp when the service provides one
+
+    Every event has "elapsed_ms", the milliseconds from the invocation request to its
+    arrival (see services.trace_analysis).
+    """
+    if not agent_id or not agent_alias_id:
+        raise ValueError("agent_id and agent_alias_id are required (set BEDROCK_AGENT_ID and BEDROCK_AGENT_ALIAS_ID)")
+
+    started = time.perf_counter()
+    completion = None
+    try:
+        response = get_client().invoke_agent(
+            agentId=agent_id,
+            agentAliasId=agent_alias_id,
             enableTrace=True,
             sessionId=session_id,
-            inputText=prompt
+            inputText=prompt,
+            streamingConfigurations={"streamFinalResponse": True}
         )
 
-        output_text = ""
-        citations = []
-        trace = {}
+        completion = response.get("completion")
+        seen_pre_guardrail = False
 
-        for event in response.get("completion"):
-            # Combine the chunks to get the output text
+        for event in completion:
+            elapsed_ms = (time.perf_counter() - started) * 1000
             if "chunk" in event:
                 chunk = event["chunk"]
-                output_text += chunk["bytes"].decode()
+                yield {"type": "chunk", "text": chunk["bytes"].decode(), "elapsed_ms": elapsed_ms}
                 if "attribution" in chunk:
-                    citations += chunk["attribution"]["citations"]
+                    yield {"type": "citations", "citations": chunk["attribution"]["citations"], "elapsed_ms": elapsed_ms}
 
             # Extract trace information from all events
             if "trace" in event:
-                for trace_type in ["guardrailTrace", "preProcessingTrace", "orchestrationTrace", "postProcessingTrace"]:
-                    if trace_type in event["trace"]["trace"]:
+                trace_part = event["trace"]
+                for trace_type in TRACE_TYPES:
+                    if trace_type in trace_part["trace"]:
                         mapped_trace_type = trace_type
                         if trace_type == "guardrailTrace":
-                            mapped_trace_type = "preGuardrailTrace" if not trace.get("preGuardrailTrace") else "postGuardrailTrace"
-
-                        if mapped_trace_type not in trace:
-                            trace[mapped_trace_type] = []
-                        trace[mapped_trace_type].append(event["trace"]["trace"][trace_type])
+                            mapped_trace_type = "postGuardrailTrace" if seen_pre_guardrail else "preGuardrailTrace"
+                            seen_pre_guardrail = True
+                        trace_event = {
+                            "type": "trace",
+                            "trace_type": mapped_trace_type,
+                            "trace": trace_part["trace"][trace_type],
+                            "elapsed_ms": elapsed_ms
+                        }
+                        for key, name in (("collaboratorName", "collaborator_name"), ("callerChain", "caller_chain"),
+                                          ("eventTime", "event_time")):
+                            if key in trace_part:
+                                trace_event[name] = trace_part[key]
+                        yield trace_event
 
     except ClientError as e:
         logger.error(f"Error invoking agent: {e}") # Log the error
         raise  # Re-raise the exception
+    finally:
+        # Releases the connection when the caller stops reading before the stream ends
+        if completion is not None:
+            completion.close()
+
+
+def invoke_agent(agent_id, agent_alias_id, session_id, prompt):
+    """Invokes the agent and returns the complete output text, citations and traces."""
+    output_chunks = []
+    citations = []
+    trace = {}
+
+    for event in invoke_agent_stream(agent_id, agent_alias_id, session_id, prompt):
+        if event["type"] == "chunk":
+            output_chunks.append(event["text"])
+        elif event["type"] == "citations":
+            citations += event["citations"]
+        elif event["type"] == "trace":
+            trace.setdefault(event["trace_type"], []).append(event["trace"])
 
     return {
-        "output_text": output_text,
+        "output_text": "".join(output_chunks),
         "citations": citations,
         "trace": trace
     }
@@ -0,0 +1,215 @@
+"""
+asyncio API for driving the agent from batch jobs (regression conversations, bulk
+status explanations).
+
+Each invocation runs the blocking invoke_agent_stream() on a worker thread and hands
+its events to the event loop as they arrive, so callers get streaming callbacks
+without an async AWS SDK:
+
+    results = asyncio.run(invoke_many(
+        agent_id, agent_alias_id,
+        [("session-1", "Hi"), ("session-1", "What is my status?"), ("session-2", "Hi")],
+        max_concurrency=8,
+        on_event=lambda request, event: ...,
+    ))
+
+Prompts of the same session run one after another in the given order (a session is
+a conversation); different sessions run concurrently, up to max_concurrency at a time.
+Throttled calls are retried with exponential backoff and jitter, and every throttle
+also halves the number of invocations allowed in flight, which then grows back by one
+per successful call (additive increase, multiplicative decrease).
+"""
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import inspect
+import logging
+import os
+import random
+import threading
+import time
+
+from botocore.exceptions import ClientError
+
+from services import bedrock_agent_runtime
+
+logger = logging.getLogger(__name__)
+
+MAX_CONCURRENCY = int(os.environ.get("BEDROCK_AGENT_BATCH_CONCURRENCY", "8"))
+MAX_RETRIES = int(os.environ.get("BEDROCK_AGENT_BATCH_MAX_RETRIES", "6"))
+BASE_DELAY_SECONDS = float(os.environ.get("BEDROCK_AGENT_BATCH_BASE_DELAY", "0.5"))
+MAX_DELAY_SECONDS = float(os.environ.get("BEDROCK_AGENT_BATCH_MAX_DELAY", "20"))
+
+THROTTLING_ERROR_CODES = ("ThrottlingException", "TooManyRequestsException", "ServiceQuotaExceededException")
+
+_DONE = object()
+
+
+class AdaptiveLimiter:
+    """Concurrency limit that halves on throttling and grows by one per success."""
+
+    def __init__(self, max_limit):
+        self.max_limit = max_limit
+        self.limit = max_limit
+        self.in_flight = 0
+        self._condition = asyncio.Condition()
+
+    async def __aenter__(self):
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+
+    async def on_success(self):
+        async with self._condition:
+            if self.limit < self.max_limit:
+                self.limit += 1
+                self._condition.notify_all()
+
+    async def on_throttle(self):
+        async with self._condition:
+            self.limit = max(1, self.limit // 2)
+
+
+def is_throttling(error):
+    return isinstance(error, ClientError) and error.response.get("Error", {}).get("Code") in THROTTLING_ERROR_CODES
+
+
+async def _call(callback, *args):
+    if callback is None:
+        return
+    result = callback(*args)
+    if inspect.isawaitable(result):
+        await result
+
+
+async def _stream(executor, stream_factory):
+    """
+    Runs a blocking event generator on a worker thread and yields its events on the loop.
+
+    When the consumer stops early (break, an exception or cancellation), the worker stops
+    at the next event and closes the generator instead of draining the rest of the stream.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    stop = threading.Event()
+
+    def pump():
+        events = None
+        try:
+            events = stream_factory()
+            for event in events:
+                if stop.is_set():
+                    return
+                loop.call_soon_threadsafe(queue.put_nowait, event)
+        except BaseException as e:
+            if not stop.is_set():
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+        else:
+            loop.call_soon_threadsafe(queue.put_nowait, _DONE)
+        finally:
+            if events is not None and hasattr(events, "close"):
+                events.close()
+
+    worker = loop.run_in_executor(executor, pump)
+    try:
+        while True:
+            item = await queue.get()
+            if item is _DONE:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+        await worker
+
+
+async def _invoke_one(executor, limiter, agent_id, agent_alias_id, request, on_event):
+    session_id, prompt = request
+    output_chunks = []
+    citations = []
+    trace = {}
+    started = time.perf_counter()
+
+    for attempt in range(1, MAX_RETRIES + 2):
+        streamed = False
+        try:
+            async with limiter:
+                events = _stream(executor, lambda: bedrock_agent_runtime.invoke_agent_stream(
+                    agent_id, agent_alias_id, session_id, prompt))
+                try:
+                    async for event in events:
+                        streamed = True
+                        if event["type"] == "chunk":
+                            output_chunks.append(event["text"])
+                        elif event["type"] == "citations":
+                            citations += event["citations"]
+                        elif event["type"] == "trace":
+                            trace.setdefault(event["trace_type"], []).append(event["trace"])
+                        await _call(on_event, request, event)
+                finally:
+                    # Stop the worker before the limiter slot is released, also when
+                    # on_event raised or the task was cancelled
+                    await events.aclose()
+            await limiter.on_success()
+            break
+        except Exception as e:
+            # Events already handed to the caller cannot be taken back, so only calls
+            # throttled before streaming started are retried
+            if not is_throttling(e) or streamed or attempt > MAX_RETRIES:
+                return {
+                    "session_id": session_id, "prompt": prompt, "output_text": "".join(output_chunks),
+                    "citations": citations, "trace": trace, "error": e, "attempts": attempt,
+                    "elapsed_s": time.perf_counter() - started
+                }
+            await limiter.on_throttle()
+            delay = min(MAX_DELAY_SECONDS, BASE_DELAY_SECONDS * (2 ** (attempt - 1)))
+            logger.warning(f"Throttled invoking agent for session {session_id}, retrying in up to {delay:.2f}s")
+            await asyncio.sleep(random.uniform(0, delay))
+
+    return {
+        "session_id": session_id, "prompt": prompt, "output_text": "".join(output_chunks),
+        "citations": citations, "trace": trace, "error": None, "attempts": attempt,
+        "elapsed_s": time.perf_counter() - started
+    }
+
+
+async def invoke_many(agent_id, agent_alias_id, requests, max_concurrency=MAX_CONCURRENCY,
+                      on_event=None, on_result=None):
+    """
+    Invokes the agent for many (session_id, prompt) pairs and returns one result per
+    pair, in input order. Results are dicts with session_id, prompt, output_text,
+    citations, trace, error (None on success), attempts and elapsed_s.
+
+    on_event(request, event) is called for every stream event and on_result(result)
+    when an invocation finishes; both may be plain functions or coroutines and run on
+    the event loop.
+    """
+    requests = list(requests)
+    sessions = OrderedDict()
+    for index, (session_id, prompt) in enumerate(requests):
+        sessions.setdefault(session_id, []).append((index, prompt))
+
+    results = [None] * len(requests)
+    limiter = AdaptiveLimiter(max_concurrency)
+
+    async def run_session(session_id, prompts):
+        for index, prompt in prompts:
+            result = await _invoke_one(executor, limiter, agent_id, agent_alias_id, (session_id, prompt), on_event)
+            results[index] = result
+            await _call(on_result, result)
+
+    with ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="bedrock-agent") as executor:
+        await asyncio.gather(*(run_session(session_id, prompts) for session_id, prompts in sessions.items()))
+    return results
+
+
+def invoke_many_sync(*args, **kwargs):
+    """Blocking wrapper around invoke_many() for scripts without an event loop."""
+    return asyncio.run(invoke_many(*args, **kwargs))
@@ -0,0 +1,98 @@
+"""
+Offline stand-in for the bedrock-agent-runtime client.
+
+invoke_agent() returns a completion stream shaped like the real EventStream (trace
+events followed by the response in chunks, with an attribution on the last chunk), so
+the code in services.bedrock_agent_runtime runs unchanged:
+
+    from services import bedrock_agent_runtime
+    from services.fake_agent_runtime import FakeAgentRuntime
+
+    bedrock_agent_runtime.set_client(FakeAgentRuntime(latency_ms=50, throttle_rate=0.1))
+"""
+import json
+import random
+import threading
+import time
+
+from botocore.exceptions import ClientError
+
+
+def echo_responder(session_id, prompt, turn):
+    return f"Turn {turn} of session {session_id}: you said {prompt!r}."
+
+
+class FakeAgentRuntime:
+    """
+    Produces a deterministic response per (session, turn) through `responder`.
+
+    latency_ms is spent before the first event (like the agent's orchestration),
+    chunk_delay_ms between stream events. throttle_rate is the fraction of calls that
+    fail with a ThrottlingException before any event is streamed.
+    """
+
+    def __init__(self, responder=echo_responder, latency_ms=0.0, chunk_delay_ms=0.0, chunk_size=40,
+                 throttle_rate=0.0, trace_steps=2, seed=None):
+        self.responder = responder
+        self.latency = latency_ms / 1000.0
+        self.chunk_delay = chunk_delay_ms / 1000.0
+        self.chunk_size = chunk_size
+        self.throttle_rate = throttle_rate
+        self.trace_steps = trace_steps
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.turns = {}  # session_id -> prompts seen, in order
+        self.calls = 0
+        self.throttled = 0
+
+    def invoke_agent(self, agentId, agentAliasId, sessionId, inputText, **kwargs):
+        with self._lock:
+            self.calls += 1
+            if self.throttle_rate and self._random.random() < self.throttle_rate:
+                self.throttled += 1
+                raise ClientError(
+                    {"Error": {"Code": "ThrottlingException", "Message": "Rate exceeded"}},
+                    "InvokeAgent"
+                )
+            prompts = self.turns.setdefault(sessionId, [])
+            prompts.append(inputText)
+            turn = len(prompts)
+
+        text = self.responder(sessionId, inputText, turn)
+        return {"completion": self._completion(sessionId, text), "sessionId": sessionId}
+
+    def _completion(self, session_id, text):
+        if self.latency:
+            time.sleep(self.latency)
+        for step in range(self.trace_steps):
+            trace_id = f"{session_id}-{step}"
+            yield {"trace": {"trace": {"orchestrationTrace": {
+                "modelInvocationInput": {"traceId": trace_id, "text": json.dumps({"step": step})}
+            }}}}
+            yield {"trace": {"trace": {"orchestrationTrace": {
+                "modelInvocationOutput": {"traceId": trace_id, "metadata": {
+                    "usage": {"inputTokens": 800 + 100 * step, "outputTokens": 60}
+                }}
+            }}}}
+            yield {"trace": {"trace": {"orchestrationTrace": {
+                "rationale": {"traceId": trace_id, "text": f"Reasoning for step {step}"}
+            }}}}
+            if step < self.trace_steps - 1:
+                # Every step but the last calls an action group
+                yield {"trace": {"trace": {"orchestrationTrace": {
+                    "invocationInput": {"traceId": trace_id, "invocationType": "ACTION_GROUP", "actionGroupInvocationInput": {
+                        "actionGroupName": "account_status_action_group", "apiPath": "/getuserdetails", "verb": "get"
+                    }}
+                }}}}
+                yield {"trace": {"trace": {"orchestrationTrace": {
+                    "observation": {"traceId": trace_id, "type": "ACTION_GROUP", "actionGroupInvocationOutput": {"text": "{}"}}
+                }}}}
+
+        pieces = [text[start:start + self.chunk_size] for start in range(0, len(text), self.chunk_size)] or [""]
+        for index, piece in enumerate(pieces):
+            if self.chunk_delay:
+                time.sleep(self.chunk_delay)
+            chunk = {"bytes": piece.encode()}
+            if index == len(pieces) - 1:
+                chunk["attribution"] = {"citations": []}
+            yield {"chunk": chunk}
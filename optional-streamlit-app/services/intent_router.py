@@ -0,0 +1,193 @@
+"""
+Local fast path for turns that do not need the supervisor agent.
+
+A plain greeting ("Hi", "Hello") is answered with the greeting the master agent
+instructions prescribe, and a clear request for a human ("connect me to a human agent")
+is sent straight to the human handoff action group Lambda. Everything else, including
+greetings with a question attached, goes to Bedrock as before. The patterns only match
+whole messages, so anything they do not fully cover is left to the agent.
+
+Enable with LOCAL_INTENT_ROUTER=true. Handoffs are only routed locally when
+HANDOFF_FUNCTION_NAME names the handoff Lambda (publish-to-sqs-svc, or the action group
+router); the front end then needs lambda:InvokeFunction on it.
+"""
+from datetime import datetime, timezone
+import json
+import logging
+import os
+import re
+import threading
+
+import boto3
+from botocore.config import Config
+
+logger = logging.getLogger(__name__)
+
+ENABLED = os.environ.get("LOCAL_INTENT_ROUTER", "false").lower() == "true"
+HANDOFF_FUNCTION_NAME = os.environ.get("HANDOFF_FUNCTION_NAME")
+HANDOFF_ACTION_GROUP = os.environ.get("HANDOFF_ACTION_GROUP", "human_handoff_action_group")
+
+# Per master_agent_instructions.txt: respond politely, thank the user for contacting
+# EazyBank and ask how to help with their banking needs
+GREETING_TEXT = os.environ.get(
+    "LOCAL_GREETING_TEXT",
+    "Hello! Thank you for contacting EazyBank. How can I help you with your banking needs today?"
+)
+# Per human_handoff_agent_instructions.txt
+HANDOFF_TEXT = os.environ.get(
+    "LOCAL_HANDOFF_TEXT",
+    "I'm transferring you to a human agent now. A representative will be with you shortly."
+)
+
+GREETING = "greeting"
+HANDOFF = "handoff"
+
+_HUMAN = r"(a\s+|an\s+|the\s+)?(human|human\s+agent|real\s+person|person|live\s+agent|agent|representative|someone|customer\s+service)"
+_END = r"[\s.!?]*$"
+
+# Compiled once at import; checked in order, the first full match wins
+PATTERNS = [
+    (GREETING, re.compile(
+        r"^\s*(hi|hello|hey|hiya|greetings|good\s+(morning|afternoon|evening))(\s+(there|eazybank|team))?" + _END,
+        re.IGNORECASE
+    )),
+    (HANDOFF, re.compile(
+        r"^\s*(please\s+)?(connect|transfer|put)\s+me\s+(through\s+)?(to|with)\s+" + _HUMAN + r"(\s+please)?" + _END,
+        re.IGNORECASE
+    )),
+    (HANDOFF, re.compile(
+        r"^\s*(i\s+)?(want|would\s+like|need|wish)\s+to\s+(talk|speak|chat)\s+(to|with)\s+" + _HUMAN + r"(\s+please)?" + _END,
+        re.IGNORECASE
+    )),
+    (HANDOFF, re.compile(
+        r"^\s*(can|could|may)\s+i\s+(please\s+)?(talk|speak|chat)\s+(to|with)\s+" + _HUMAN + r"(\s+please)?" + _END,
+        re.IGNORECASE
+    )),
+    (HANDOFF, re.compile(
+        r"^\s*(human|human\s+agent|live\s+agent|representative)(\s+please)?" + _END,
+        re.IGNORECASE
+    )),
+]
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Returns the process-wide Lambda client, creating it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = boto3.client(
+                    service_name="lambda",
+                    config=Config(connect_timeout=5, read_timeout=30, retries={"mode": "standard", "max_attempts": 2})
+                )
+    return _client
+
+
+def set_client(client):
+    """Installs the Lambda client to use instead of a real one."""
+    global _client
+    with _client_lock:
+        _client = client
+
+
+def classify(prompt):
+    """Returns GREETING, HANDOFF or None for a prompt."""
+    for intent, pattern in PATTERNS:
+        if pattern.match(prompt):
+            return intent
+    return None
+
+
+def handoff_event(session_id, prompt, conversation_history, session_attributes):
+    """The event the agent would send to the /store_conversation_data action."""
+    properties = {
+        "user_message": prompt,
+        "conversation_history": conversation_history,
+        "session_id": session_id,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    }
+    return {
+        "messageVersion": "1.0",
+        "actionGroup": HANDOFF_ACTION_GROUP,
+        "apiPath": "/store_conversation_data",
+        "httpMethod": "POST",
+        "sessionId": session_id,
+        "inputText": prompt,
+        "requestBody": {"content": {"application/json": {"properties": [
+            {"name": name, "type": "string", "value": value} for name, value in properties.items()
+        ]}}},
+        "sessionAttributes": session_attributes,
+        "promptSessionAttributes": {},
+    }
+
+
+class IntentRouter:
+    """
+    Decides per turn whether the prompt can be answered locally and keeps the hit-rate
+    counts of one session. route() returns the response text, or None when the prompt
+    has to go to the agent.
+    """
+
+    def __init__(self, enabled=ENABLED, handoff_function_name=HANDOFF_FUNCTION_NAME):
+        self.enabled = enabled
+        self.handoff_function_name = handoff_function_name
+        self.turns = 0
+        self.hits = {}  # intent -> turns answered locally
+        self.fallbacks = 0  # turns classified locally but still sent to the agent
+        # Session attributes returned by the handoff Lambda (its session digest), passed
+        # back on the next local handoff as the agent would
+        self.session_attributes = {}
+
+    @property
+    def hit_count(self):
+        return sum(self.hits.values())
+
+    @property
+    def hit_rate(self):
+        return self.hit_count / self.turns if self.turns else 0.0
+
+    def route(self, session_id, prompt, conversation_history=""):
+        if not self.enabled:
+            return None
+        self.turns += 1
+        intent = classify(prompt)
+
+        text = None
+        if intent == GREETING:
+            text = GREETING_TEXT
+        elif intent == HANDOFF and self.handoff_function_name:
+            text = self._handoff(session_id, prompt, conversation_history)
+
+        if text is None:
+            if intent is not None:
+                self.fallbacks += 1
+            logger.debug(f"Intent router: sending turn to the agent (intent {intent})")
+            return None
+        self.hits[intent] = self.hits.get(intent, 0) + 1
+        logger.info(
+            f"Intent router: answered {intent} locally for session {session_id} "
+            f"({self.hit_count}/{self.turns} turns local, {self.hit_rate:.0%})"
+        )
+        return text
+
+    def _handoff(self, session_id, prompt, conversation_history):
+        """Invokes the handoff action Lambda; returns None (use the agent) if it fails."""
+        event = handoff_event(session_id, prompt, conversation_history, self.session_attributes)
+        try:
+            response = get_client().invoke(
+                FunctionName=self.handoff_function_name,
+                InvocationType="RequestResponse",
+                Payload=json.dumps(event).encode()
+            )
+            result = json.loads(response["Payload"].read())
+        except Exception as e:
+            logger.warning(f"Intent router: local handoff for session {session_id} failed, using the agent: {e}")
+            return None
+        if response.get("FunctionError") or result.get("response", {}).get("httpStatusCode") != 200:
+            logger.warning(f"Intent router: handoff Lambda rejected session {session_id}'s request: {result}")
+            return None
+        self.session_attributes = result.get("sessionAttributes") or {}
+        return HANDOFF_TEXT
@@ -0,0 +1,121 @@
+from collections import deque
+import json
+import os
+import re
+
+# Messages kept verbatim; older ones are folded into the summary block
+WINDOW_MESSAGES = int(os.environ.get("CHAT_WINDOW_MESSAGES", "20"))
+# Upper bound for the text, citations and rendered output held per session
+MAX_BYTES = int(os.environ.get("CHAT_MAX_BYTES", str(256 * 1024)))
+# Upper bound for the summary block; its oldest lines are dropped beyond this
+SUMMARY_MAX_CHARS = int(os.environ.get("CHAT_SUMMARY_MAX_CHARS", "4000"))
+# Characters of each folded message kept in the summary
+SUMMARY_LINE_CHARS = 160
+
+CITATION_MARKER = re.compile(r"%\[(\d+)\]%")
+
+
+class Message:
+    """One chat message. Citations are kept as data and only turned into HTML by render()."""
+
+    __slots__ = ("role", "content", "citations", "_rendered", "size")
+
+    def __init__(self, role, content, citations=None):
+        self.role = role
+        self.content = content
+        self.citations = citations or []
+        self._rendered = None
+        self.size = len(content.encode("utf-8")) + (len(json.dumps(self.citations, default=str)) if self.citations else 0)
+
+    def citation_uris(self):
+        """The S3 URI of every retrieved reference, numbered in order of appearance."""
+        return [
+            retrieved_ref["location"]["s3Location"]["uri"]
+            for citation in self.citations
+            for retrieved_ref in citation["retrievedReferences"]
+        ]
+
+    def render(self):
+        """Markdown (with citation HTML) for the message, built once and then reused."""
+        if self._rendered is None:
+            text = self.content
+            uris = self.citation_uris()
+            if uris:
+                text = CITATION_MARKER.sub(r"<sup>[\1]</sup>", text)
+                text += "\n" + "".join(f"\n<br>[{citation_num}] {uri}" for citation_num, uri in enumerate(uris, start=1))
+            self._rendered = text
+            self.size += len(text.encode("utf-8"))
+        return self._rendered
+
+    @property
+    def unsafe_html(self):
+        # Assistant output may carry citation HTML; user input is shown as plain markdown
+        return self.role == "assistant"
+
+
+class MessageStore:
+    """
+    The chat history of one session: a window of recent messages plus a summary
+    block of the older ones. Both the window size and the bytes held are bounded.
+    """
+
+    def __init__(self, window=WINDOW_MESSAGES, max_bytes=MAX_BYTES, summary_max_chars=SUMMARY_MAX_CHARS):
+        self.window = window
+        self.max_bytes = max_bytes
+        self.summary_max_chars = summary_max_chars
+        self.messages = deque()
+        self.summary_lines = deque()
+        self.summary_chars = 0
+        self.folded_count = 0
+        self.size = 0
+
+    def __iter__(self):
+        return iter(self.messages)
+
+    def __len__(self):
+        return len(self.messages)
+
+    def add(self, role, content, citations=None):
+        message = Message(role, content, citations)
+        self.messages.append(message)
+        self.size += message.size
+        self._trim()
+        return message
+
+    def render(self, message):
+        before = message.size
+        rendered = message.render()
+        # The rendered output counts towards the budget from the next add() on; trimming
+        # here would change the window while it is being displayed
+        self.size += message.size - before
+        return rendered
+
+    @property
+    def summary(self):
+        """Markdown for the folded messages, or None if nothing was folded."""
+        if not self.folded_count:
+            return None
+        return "\n".join(self.summary_lines)
+
+    def transcript(self):
+        """Plain text of the conversation (summary of the folded messages, then the window), e.g. for a handoff."""
+        lines = [self.summary] if self.folded_count else []
+        lines += [f"{message.role.capitalize()}: {message.content}" for message in self.messages]
+        return "\n".join(lines)
+
+    def _trim(self):
+        # Keep at least the latest message, even if it alone is over the byte budget
+        while len(self.messages) > 1 and (len(self.messages) > self.window or self.size > self.max_bytes):
+            self._fold(self.messages.popleft())
+
+    def _fold(self, message):
+        self.size -= message.size
+        self.folded_count += 1
+        text = " ".join(CITATION_MARKER.sub("", message.content).split())
+        if len(text) > SUMMARY_LINE_CHARS:
+            text = text[:SUMMARY_LINE_CHARS - 1] + "…"
+        line = f"- **{message.role.capitalize()}:** {text}"
+        self.summary_lines.append(line)
+        self.summary_chars += len(line) + 1
+        while len(self.summary_lines) > 1 and self.summary_chars > self.summary_max_chars:
+            self.summary_chars -= len(self.summary_lines.popleft()) + 1
@@ -0,0 +1,205 @@
+"""
+Per-hop latency waterfall of one agent turn, reconstructed from its trace events.
+
+invoke_agent_stream() stamps every event with the milliseconds since the invocation
+started. Feeding the events of a turn to a WaterfallRecorder pairs the trace parts
+that open and close a hop (same agent and traceId):
+
+  - model: modelInvocationInput -> modelInvocationOutput (reasoning of the supervisor
+    or a collaborator, pre/post-processing), with token usage from the output metadata
+  - action_group / knowledge_base / collaborator: invocationInput -> observation
+  - guardrail: one span per guardrail trace
+
+Where the trace carries its own timing (metadata.totalTimeMs) that duration is used,
+otherwise the time between the two events' arrival. Spans of collaborator agents are
+nested one level deeper per agent in the caller chain.
+"""
+import json
+import os
+import time
+
+from services.trace_store import json_serial
+
+# Characters of the bar drawn for each span in the sidebar timeline
+TIMELINE_WIDTH = int(os.environ.get("TRACE_TIMELINE_WIDTH", "24"))
+
+SUPERVISOR = "supervisor"
+
+PHASES = {
+    "preGuardrailTrace": "guardrail",
+    "preProcessingTrace": "pre-processing",
+    "orchestrationTrace": "orchestration",
+    "postProcessingTrace": "post-processing",
+    "postGuardrailTrace": "guardrail",
+}
+
+# Observation type -> span kind (FINISH, ASK_USER and REPROMPT do not close a hop)
+OBSERVATION_KINDS = {
+    "ACTION_GROUP": "action_group",
+    "KNOWLEDGE_BASE": "knowledge_base",
+    "AGENT_COLLABORATOR": "collaborator",
+}
+
+
+def _metadata(body):
+    """The timing/usage metadata of a trace part, which some parts nest one level down."""
+    if isinstance(body.get("metadata"), dict):
+        return body["metadata"]
+    for value in body.values():
+        if isinstance(value, dict) and isinstance(value.get("metadata"), dict):
+            return value["metadata"]
+    return {}
+
+
+def _invocation(body):
+    """(kind, name) of the hop an invocationInput starts, or (None, None)."""
+    if "actionGroupInvocationInput" in body:
+        action = body["actionGroupInvocationInput"]
+        target = action.get("apiPath") or action.get("function") or ""
+        return "action_group", " ".join(filter(None, [action.get("actionGroupName"), action.get("verb", "").upper(), target]))
+    if "knowledgeBaseLookupInput" in body:
+        return "knowledge_base", body["knowledgeBaseLookupInput"].get("knowledgeBaseId", "knowledge base")
+    if "agentCollaboratorInvocationInput" in body:
+        return "collaborator", body["agentCollaboratorInvocationInput"].get("agentCollaboratorName", "collaborator")
+    return None, None
+
+
+class Waterfall:
+    """The spans of one turn, in start order, plus the turn's overall timings."""
+
+    def __init__(self, spans, total_ms, first_chunk_ms=None, started_at=None):
+        self.spans = sorted(spans, key=lambda span: (span["start_ms"], span["depth"]))
+        self.total_ms = total_ms
+        self.first_chunk_ms = first_chunk_ms
+        self.started_at = started_at
+        self._timeline = None
+
+    def totals(self):
+        """Milliseconds per span kind. Nested spans overlap their collaborator span."""
+        totals = {}
+        for span in self.spans:
+            totals[span["kind"]] = totals.get(span["kind"], 0.0) + span["duration_ms"]
+        return totals
+
+    def tokens(self):
+        input_tokens = sum(span.get("input_tokens") or 0 for span in self.spans)
+        output_tokens = sum(span.get("output_tokens") or 0 for span in self.spans)
+        return input_tokens, output_tokens
+
+    def summary(self):
+        input_tokens, output_tokens = self.tokens()
+        text = f"{self.total_ms / 1000:.2f}s total"
+        if self.first_chunk_ms is not None:
+            text += f", first text after {self.first_chunk_ms / 1000:.2f}s"
+        if input_tokens or output_tokens:
+            text += f", {input_tokens} in / {output_tokens} out tokens"
+        return text
+
+    def timeline(self, width=TIMELINE_WIDTH):
+        """A plain-text waterfall: one bar per span, scaled to the turn's duration."""
+        if self._timeline is None:
+            scale = width / self.total_ms if self.total_ms else 0
+            lines = []
+            for span in self.spans:
+                start = min(width - 1, int(span["start_ms"] * scale))
+                length = max(1, min(width - start, round(span["duration_ms"] * scale)))
+                bar = " " * start + "█" * length + " " * (width - start - length)
+                label = span["name"] if span["agent"] == SUPERVISOR else f"{span['agent']}: {span['name']}"
+                if span.get("input_tokens") is not None:
+                    label += f" ({span['input_tokens']}/{span['output_tokens']} tok)"
+                lines.append(f"{bar} {span['duration_ms']:>7.0f} ms {'  ' * span['depth']}{span['kind']} {label}")
+            self._timeline = "\n".join(lines)
+        return self._timeline
+
+    def to_dict(self):
+        return {
+            "started_at": self.started_at,
+            "total_ms": self.total_ms,
+            "first_chunk_ms": self.first_chunk_ms,
+            "totals_ms": self.totals(),
+            "spans": self.spans,
+        }
+
+    def to_jsonl(self, **fields):
+        """One JSON line per span, each carrying the given fields (e.g. session_id, turn) and the turn timings."""
+        turn = dict(fields, started_at=self.started_at, total_ms=self.total_ms, first_chunk_ms=self.first_chunk_ms)
+        return "".join(json.dumps(dict(turn, **span), default=json_serial) + "\n" for span in self.spans)
+
+
+class WaterfallRecorder:
+    """Collects the stream events of one turn (see invoke_agent_stream) and builds its Waterfall."""
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.spans = []
+        self.first_chunk_ms = None
+        self.last_ms = 0.0
+        self._open = {}  # (agent, traceId, kind) -> span
+
+    def add(self, event):
+        at = event.get("elapsed_ms", self.last_ms)
+        self.last_ms = max(self.last_ms, at)
+        if event["type"] == "chunk" and self.first_chunk_ms is None:
+            self.first_chunk_ms = at
+        elif event["type"] == "trace":
+            self._add_trace(event, at)
+
+    def _add_trace(self, event, at):
+        agent = event.get("collaborator_name") or SUPERVISOR
+        depth = max(0, len(event.get("caller_chain") or []) - 1)
+        phase = PHASES.get(event["trace_type"], event["trace_type"])
+        trace = event["trace"]
+
+        if phase == "guardrail":
+            span = self._start("guardrail", f"{event['trace_type']} {trace.get('action', '')}".strip(), agent, depth, phase, at)
+            self._finish(span, at, _metadata(trace))
+            return
+
+        for part, body in trace.items():
+            if not isinstance(body, dict):
+                continue
+            trace_id = body.get("traceId")
+            if part == "modelInvocationInput":
+                self._open[(agent, trace_id, "model")] = self._start("model", phase, agent, depth, phase, at)
+            elif part == "modelInvocationOutput":
+                span = self._open.pop((agent, trace_id, "model"), None) or self._start("model", phase, agent, depth, phase, at)
+                metadata = _metadata(body)
+                usage = metadata.get("usage") or {}
+                if usage:
+                    span["input_tokens"] = usage.get("inputTokens", 0)
+                    span["output_tokens"] = usage.get("outputTokens", 0)
+                self._finish(span, at, metadata)
+            elif part == "invocationInput":
+                kind, name = _invocation(body)
+                if kind:
+                    self._open[(agent, trace_id, kind)] = self._start(kind, name, agent, depth, phase, at)
+            elif part == "observation":
+                kind = OBSERVATION_KINDS.get(body.get("type"))
+                span = self._open.pop((agent, trace_id, kind), None)
+                if span:
+                    self._finish(span, at, _metadata(body))
+
+    def _start(self, kind, name, agent, depth, phase, at):
+        return {"kind": kind, "name": name, "agent": agent, "depth": depth, "phase": phase, "start_ms": at}
+
+    def _finish(self, span, at, metadata):
+        measured = metadata.get("totalTimeMs")
+        if measured is not None:
+            if span["start_ms"] == at:
+                # Only the closing part arrived (e.g. guardrails): place the span before it
+                span["start_ms"] = max(0.0, at - measured)
+            span["duration_ms"] = float(measured)
+            span["timing"] = "trace"
+        else:
+            span["duration_ms"] = at - span["start_ms"]
+            span["timing"] = "arrival"
+        self.spans.append(span)
+
+    def waterfall(self):
+        # Hops still open when the stream ended (e.g. the turn failed) run to its end
+        for span in self._open.values():
+            span["duration_ms"] = self.last_ms - span["start_ms"]
+            span["timing"] = "unfinished"
+            self.spans.append(span)
+        self._open = {}
+        return Waterfall(self.spans, self.last_ms, self.first_chunk_ms, self.started_at)
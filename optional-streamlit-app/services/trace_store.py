@@ -0,0 +1,117 @@
+from collections import deque
+from datetime import datetime
+import json
+import os
+
+# Maximum number of turns whose traces are kept per session (oldest are dropped)
+MAX_TURNS = int(os.environ.get("TRACE_HISTORY_TURNS", "20"))
+# Trace steps shown per sidebar page
+STEPS_PER_PAGE = int(os.environ.get("TRACE_STEPS_PER_PAGE", "10"))
+
+TRACE_TYPES_MAP = {
+    "Pre-Processing": ["preGuardrailTrace", "preProcessingTrace"],
+    "Orchestration": ["orchestrationTrace"],
+    "Post-Processing": ["postProcessingTrace", "postGuardrailTrace"]
+}
+
+TRACE_INFO_TYPES_MAP = {
+    "preProcessingTrace": ["modelInvocationInput", "modelInvocationOutput"],
+    "orchestrationTrace": ["invocationInput", "modelInvocationInput", "modelInvocationOutput", "observation", "rationale"],
+    "postProcessingTrace": ["modelInvocationInput", "modelInvocationOutput", "observation"]
+}
+
+
+# JSON Serializer function
+def json_serial(obj):
+    """JSON serializer for objects not serializable by default json code"""
+    if isinstance(obj, (datetime)):
+        return obj.isoformat()
+    raise TypeError("Type %s not serializable" % type(obj))
+
+
+def group_trace(trace):
+    """
+    Organizes the traces of one turn by step, similar to how they are shown in the
+    Bedrock console. Returns a list of (header, step_num, [trace, ...]) in display order.
+    """
+    steps = []
+    step_num = 1
+    for trace_type_header, trace_types in TRACE_TYPES_MAP.items():
+        for trace_type in trace_types:
+            if trace_type not in trace:
+                continue
+            trace_steps = {}
+
+            for step_trace in trace[trace_type]:
+                # Each trace type and step may have different information for the end-to-end flow
+                if trace_type in TRACE_INFO_TYPES_MAP:
+                    for trace_info_type in TRACE_INFO_TYPES_MAP[trace_type]:
+                        if trace_info_type in step_trace:
+                            trace_id = step_trace[trace_info_type]["traceId"]
+                            trace_steps.setdefault(trace_id, []).append(step_trace)
+                            break
+                else:
+                    trace_steps[step_trace["traceId"]] = [{trace_type: step_trace}]
+
+            for traces in trace_steps.values():
+                steps.append((trace_type_header, step_num, traces))
+                step_num += 1
+    return steps
+
+
+class Turn:
+    """The grouped traces, citations and latency waterfall of one chat turn, with memoized JSON."""
+
+    def __init__(self, number, prompt, trace, citations, waterfall=None):
+        self.number = number
+        self.prompt = prompt
+        self.steps = group_trace(trace)
+        self.citations = citations
+        self.waterfall = waterfall
+        self._json = {}
+
+    def page_count(self, per_page=STEPS_PER_PAGE):
+        return max(1, -(-len(self.steps) // per_page))
+
+    def steps_page(self, page, per_page=STEPS_PER_PAGE):
+        """The steps on a zero-based page."""
+        return self.steps[page * per_page:(page + 1) * per_page]
+
+    def to_json(self, key, obj):
+        """Pretty-prints obj on first request and returns the cached string afterwards."""
+        text = self._json.get(key)
+        if text is None:
+            text = json.dumps(obj, indent=2, default=json_serial)
+            self._json[key] = text
+        return text
+
+
+class TraceStore:
+    """Traces of the most recent turns of one session, oldest first."""
+
+    def __init__(self, max_turns=MAX_TURNS):
+        self.turns = deque(maxlen=max_turns)
+        self._next_number = 1
+
+    def add_turn(self, prompt, trace, citations, waterfall=None):
+        turn = Turn(self._next_number, prompt, trace, citations, waterfall)
+        self._next_number += 1
+        self.turns.append(turn)
+        return turn
+
+    def get(self, number):
+        for turn in self.turns:
+            if turn.number == number:
+                return turn
+        return None
+
+    @property
+    def latest(self):
+        return self.turns[-1] if self.turns else None
+
+    def to_jsonl(self, session_id):
+        """The waterfall spans of the kept turns as JSON lines, for offline aggregation."""
+        return "".join(
+            turn.waterfall.to_jsonl(session_id=session_id, turn=turn.number, prompt=turn.prompt)
+            for turn in self.turns if turn.waterfall is not None
+        )
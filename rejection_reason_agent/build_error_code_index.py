@@ -0,0 +1,66 @@
+"""
+Offline build step: compiles the ErrorCode policy PDF into a compact lookup table.
+
+Reads 'Description+of+the+various+ErrorCode+in+New+Account+Opening.pdf' (the document
+behind the rejection_reason_agent knowledge base) and writes
+eazybank_common/data/error_code_index.json, which ships in the shared Lambda layer and
+is loaded once per container by eazybank_common.rejection_reasons.
+
+Re-run whenever the PDF changes. Requires pypdf at build time only:
+    pip install pypdf
+    python rejection_reason_agent/build_error_code_index.py
+"""
+import argparse
+import json
+import os
+import re
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PDF = os.path.join(HERE, 'Description+of+the+various+ErrorCode+in+New+Account+Opening.pdf')
+DEFAULT_OUTPUT = os.path.join(HERE, '..', 'eazybank_common', 'data', 'error_code_index.json')
+
+# "1. ErrorCode – InvalidIdentification" (en dash, hyphen or colon as separator)
+HEADING = re.compile(r'^\s*\d+\.\s*ErrorCode\s*[–\-:]\s*(\w+)\s*$', re.MULTILINE)
+
+
+def extract_text(pdf_path):
+    from pypdf import PdfReader
+    return '\n'.join(page.extract_text() or '' for page in PdfReader(pdf_path).pages)
+
+
+def parse_error_codes(text):
+    """Returns {error code: explanation} for every numbered ErrorCode section."""
+    headings = list(HEADING.finditer(text))
+    error_codes = {}
+    for index, heading in enumerate(headings):
+        end = headings[index + 1].start() if index + 1 < len(headings) else len(text)
+        explanation = ' '.join(text[heading.end():end].split())
+        if not explanation.endswith('.'):
+            explanation += '.'
+        error_codes[heading.group(1)] = explanation
+    return error_codes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--pdf', default=DEFAULT_PDF)
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    args = parser.parse_args()
+
+    error_codes = parse_error_codes(extract_text(args.pdf))
+    if not error_codes:
+        raise SystemExit(f'No ErrorCode sections found in {args.pdf}')
+
+    index = {
+        'version': 1,
+        'source': os.path.basename(args.pdf),
+        'error_codes': error_codes,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=2, ensure_ascii=False)
+        f.write('\n')
+    print(f'Wrote {len(error_codes)} error codes to {os.path.normpath(args.output)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+from eazybank_common import bootstrap, envelope, rejection_reasons
+from eazybank_common.instrumentation import add_count, get_logger, instrument_handler, timed
+
+logger = get_logger(__name__)
+
+
+@instrument_handler('rejection_reason')
+def lambda_handler(event, context):
+    """
+    Explains a rejection ErrorCode from the precompiled index, without a knowledge base
+    retrieval.
+
+    Args:
+        event (dict): Event data passed to the Lambda function. The error code (or the
+            rejection reason text containing it) is expected in the 'error_code' parameter.
+        context (object): Lambda context object.
+
+    Returns:
+        dict: The explanation, or found=False for codes that are not in the index (the agent
+        then falls back to the knowledge base), formatted for a Bedrock Agent. A request
+        without an error code is answered with a 400 error.
+    """
+    error_code = None
+    for param in event.get('parameters') or []:
+        if param.get('name') == 'error_code':
+            error_code = param.get('value')
+
+    if error_code is None or not str(error_code).strip():
+        logger.warning("Missing required parameter: error_code")
+        return envelope.error(event, 400, 'Missing required parameter: error_code')
+
+    with timed('Lookup'):
+        match = rejection_reasons.find(error_code)
+
+    if match is not None:
+        code, explanation = match
+        add_count('IndexHits')
+        body = {'error_code': code, 'found': True, 'explanation': explanation}
+    else:
+        add_count('IndexMisses')
+        logger.info("Error code not in index, falling back to knowledge base: %s", error_code)
+        body = {
+            'error_code': error_code,
+            'found': False,
+            'message': 'Error code not found in the index. Use the knowledge base for a detailed explanation.'
+        }
+
+    return envelope.response(event, body)
+
+
+bootstrap.register_priming_hook(rejection_reasons.preload)
+bootstrap.prime_on_init()
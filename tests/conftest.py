@@ -0,0 +1,9 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The layer package, the Streamlit app's services and the offline AWS fakes
+for path in (ROOT, os.path.join(ROOT, 'optional-streamlit-app'), os.path.join(ROOT, 'benchmarks')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
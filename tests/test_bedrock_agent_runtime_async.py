@@ -0,0 +1,210 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+from botocore.exceptions import ClientError
+import pytest
+
+from services import bedrock_agent_runtime, bedrock_agent_runtime_async
+from services.bedrock_agent_runtime_async import AdaptiveLimiter, invoke_many, invoke_many_sync
+from services.fake_agent_runtime import FakeAgentRuntime, echo_responder
+
+
+class ScriptedRuntime(FakeAgentRuntime):
+    """Throttles the first `throttled_calls` calls and records concurrency and stream closes."""
+
+    def __init__(self, throttled_calls=0, **kwargs):
+        super().__init__(**kwargs)
+        self.throttled_calls = throttled_calls
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.events_produced = 0
+        self.streams_closed = 0
+        self._stats_lock = threading.Lock()
+
+    def invoke_agent(self, agentId, agentAliasId, sessionId, inputText, **kwargs):
+        with self._stats_lock:
+            self.throttled_calls -= 1
+            throttle = self.throttled_calls >= 0
+        if throttle:
+            with self._lock:
+                self.calls += 1
+                self.throttled += 1
+            raise ClientError({"Error": {"Code": "ThrottlingException", "Message": "Rate exceeded"}}, "InvokeAgent")
+        response = super().invoke_agent(agentId, agentAliasId, sessionId, inputText, **kwargs)
+        response["completion"] = self._tracked(response["completion"])
+        return response
+
+    def _tracked(self, completion):
+        with self._stats_lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            for event in completion:
+                with self._stats_lock:
+                    self.events_produced += 1
+                yield event
+        finally:
+            with self._stats_lock:
+                self.in_flight -= 1
+                self.streams_closed += 1
+
+
+@pytest.fixture
+def runtime(monkeypatch):
+    monkeypatch.setattr(bedrock_agent_runtime_async, "BASE_DELAY_SECONDS", 0.001)
+
+    def install(**kwargs):
+        fake = ScriptedRuntime(**kwargs)
+        bedrock_agent_runtime.set_client(fake)
+        return fake
+
+    yield install
+    bedrock_agent_runtime.set_client(None)
+
+
+def test_results_follow_input_order_and_sessions_run_in_order(runtime):
+    fake = runtime(latency_ms=5)
+    requests = [("s1", "Hi"), ("s2", "Hi"), ("s1", "What is my status?"), ("s3", "Hi"), ("s1", "Thanks")]
+
+    results = invoke_many_sync("agent", "alias", requests, max_concurrency=2)
+
+    assert [(result["session_id"], result["prompt"]) for result in results] == requests
+    assert all(result["error"] is None and result["attempts"] == 1 for result in results)
+    assert results[2]["output_text"] == echo_responder("s1", "What is my status?", 2)
+    assert fake.turns["s1"] == ["Hi", "What is my status?", "Thanks"]
+    assert results[0]["citations"] == []
+    assert "orchestrationTrace" in results[0]["trace"]
+
+
+def test_concurrency_is_bounded(runtime):
+    fake = runtime(latency_ms=20)
+    requests = [(f"s{index}", "Hi") for index in range(8)]
+
+    invoke_many_sync("agent", "alias", requests, max_concurrency=3)
+
+    assert fake.max_in_flight <= 3
+    assert fake.streams_closed == 8
+
+
+def test_throttled_calls_are_retried(runtime):
+    fake = runtime(throttled_calls=2)
+
+    result, = invoke_many_sync("agent", "alias", [("s1", "Hi")])
+
+    assert result["error"] is None
+    assert result["attempts"] == 3
+    assert fake.throttled == 2
+    assert result["output_text"] == echo_responder("s1", "Hi", 1)
+
+
+def test_retries_are_bounded(runtime, monkeypatch):
+    monkeypatch.setattr(bedrock_agent_runtime_async, "MAX_RETRIES", 2)
+    fake = runtime(throttled_calls=10)
+
+    result, = invoke_many_sync("agent", "alias", [("s1", "Hi")])
+
+    assert isinstance(result["error"], ClientError)
+    assert result["attempts"] == 3
+    assert fake.calls == 3
+
+
+def test_other_errors_are_returned_without_retry(runtime):
+    runtime()
+
+    result, = invoke_many_sync("", "alias", [("s1", "Hi")])
+
+    assert isinstance(result["error"], ValueError)
+    assert result["attempts"] == 1
+
+
+def test_callbacks_receive_events_and_results(runtime):
+    runtime()
+    events, finished = [], []
+
+    async def on_result(result):
+        finished.append(result["prompt"])
+
+    asyncio.run(invoke_many("agent", "alias", [("s1", "Hi"), ("s1", "Bye")],
+                            on_event=lambda request, event: events.append((request, event["type"])),
+                            on_result=on_result))
+
+    assert finished == ["Hi", "Bye"]
+    assert (("s1", "Hi"), "chunk") in events and (("s1", "Bye"), "trace") in events
+
+
+def test_consumer_stopping_early_stops_the_stream(runtime):
+    fake = runtime(chunk_delay_ms=20, chunk_size=1)
+
+    def on_event(request, event):
+        if event["type"] == "chunk":
+            raise RuntimeError("stop")
+
+    async def run():
+        limiter = AdaptiveLimiter(1)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            result = await bedrock_agent_runtime_async._invoke_one(
+                executor, limiter, "agent", "alias", ("s1", "a long prompt"), on_event)
+        return result, limiter
+
+    result, limiter = asyncio.run(run())
+
+    assert str(result["error"]) == "stop"
+    assert limiter.in_flight == 0
+    assert fake.streams_closed == 1
+    # Trace events plus the first few chunks, not the whole response
+    assert fake.events_produced < 10 + len(echo_responder("s1", "a long prompt", 1)) // 2
+
+
+def test_cancelled_invocation_releases_its_slot(runtime):
+    fake = runtime(chunk_delay_ms=20, chunk_size=1)
+
+    async def run():
+        limiter = AdaptiveLimiter(1)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            task = asyncio.ensure_future(bedrock_agent_runtime_async._invoke_one(
+                executor, limiter, "agent", "alias", ("s1", "a long prompt"), None))
+            await asyncio.sleep(0.1)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+        return limiter
+
+    limiter = asyncio.run(run())
+
+    assert limiter.in_flight == 0
+    assert fake.streams_closed == 1
+
+
+def test_limiter_halves_on_throttle_and_grows_by_one():
+    async def run():
+        limiter = AdaptiveLimiter(8)
+        limits = []
+        for _ in range(4):
+            await limiter.on_throttle()
+            limits.append(limiter.limit)
+        for _ in range(10):
+            await limiter.on_success()
+            limits.append(limiter.limit)
+        return limits
+
+    assert asyncio.run(run()) == [4, 2, 1, 1, 2, 3, 4, 5, 6, 7, 8, 8, 8, 8]
+
+
+def test_limiter_waits_for_a_free_slot():
+    async def run():
+        limiter = AdaptiveLimiter(4)
+        await limiter.on_throttle()
+        await limiter.on_throttle()  # limit 1
+        peak = 0
+
+        async def work():
+            nonlocal peak
+            async with limiter:
+                peak = max(peak, limiter.in_flight)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*(work() for _ in range(5)))
+        return peak, limiter.in_flight
+
+    assert asyncio.run(run()) == (1, 0)
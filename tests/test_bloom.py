@@ -0,0 +1,48 @@
+import pytest
+
+from eazybank_common.bloom import BloomFilter
+
+
+def numbers(start, count):
+    return [str(2000000000 + index) for index in range(start, start + count)]
+
+
+def test_added_keys_are_always_found():
+    bloom_filter = BloomFilter.for_capacity(1000, 0.01)
+    for number in numbers(0, 1000):
+        bloom_filter.add(number)
+    assert len(bloom_filter) == 1000
+    assert all(number in bloom_filter for number in numbers(0, 1000))
+
+
+def test_false_positive_rate_is_near_the_target():
+    bloom_filter = BloomFilter.for_capacity(2000, 0.01)
+    for number in numbers(0, 2000):
+        bloom_filter.add(number)
+    false_positives = sum(number in bloom_filter for number in numbers(10000, 10000))
+    assert false_positives / 10000 < 0.03
+    assert bloom_filter.expected_fp_rate() == pytest.approx(0.01, rel=0.5)
+
+
+def test_bytes_round_trip():
+    bloom_filter = BloomFilter.for_capacity(100, 0.001)
+    bloom_filter.add('2016166576')
+    loaded = BloomFilter.from_bytes(bloom_filter.to_bytes())
+    assert (loaded.num_bits, loaded.num_hashes, loaded.count) == (
+        bloom_filter.num_bits, bloom_filter.num_hashes, bloom_filter.count)
+    assert loaded.built_at == bloom_filter.built_at
+    assert '2016166576' in loaded
+
+
+def test_from_bytes_rejects_other_data():
+    blob = BloomFilter.for_capacity(100, 0.01).to_bytes()
+    with pytest.raises(ValueError):
+        BloomFilter.from_bytes(b'XXXX' + blob[4:])
+    with pytest.raises(ValueError):
+        BloomFilter.from_bytes(blob[:-1])
+
+
+@pytest.mark.parametrize('fp_rate', [0, 1, -0.1])
+def test_for_capacity_rejects_invalid_rates(fp_rate):
+    with pytest.raises(ValueError):
+        BloomFilter.for_capacity(100, fp_rate)
@@ -0,0 +1,91 @@
+from decimal import Decimal
+
+import pytest
+
+from eazybank_common.dynamodb import Projection, deserialize, deserialize_item, json_default, serialize, serialize_item
+
+
+@pytest.mark.parametrize('value, expected', [
+    ({'S': 'text'}, 'text'),
+    ({'N': '42'}, 42),
+    ({'N': '-7'}, -7),
+    ({'N': '2500.75'}, Decimal('2500.75')),
+    ({'N': '1E+3'}, Decimal('1E+3')),
+    ({'BOOL': False}, False),
+    ({'NULL': True}, None),
+    ({'B': b'\x00\x01'}, b'\x00\x01'),
+    ({'B': 'AAE='}, b'\x00\x01'),  # Streams events carry base64 text
+    ({'SS': ['a', 'b']}, {'a', 'b'}),
+    ({'NS': ['1', '0.5']}, {1, Decimal('0.5')}),
+    ({'L': [{'S': 'a'}, {'N': '1'}, {'L': [{'BOOL': True}]}]}, ['a', 1, [True]]),
+    ({'M': {'pages': {'N': '2'}, 'type': {'S': 'passport'}}}, {'pages': 2, 'type': 'passport'}),
+])
+def test_deserialize(value, expected):
+    assert deserialize(value) == expected
+
+
+def test_deserialize_item_converts_nested_values():
+    item = {
+        'phone_no': {'N': '2016166577'},
+        'user_name': {'S': 'Test User'},
+        'documents': {'L': [{'M': {'type': {'S': 'passport'}, 'pages': {'N': '2'}}}]},
+        'risk_scores': {'NS': ['0.12', '3']},
+    }
+    assert deserialize_item(item) == {
+        'phone_no': 2016166577,
+        'user_name': 'Test User',
+        'documents': [{'type': 'passport', 'pages': 2}],
+        'risk_scores': {Decimal('0.12'), 3},
+    }
+
+
+@pytest.mark.parametrize('value', [{'X': '1'}, {}, {'S': 'a', 'N': '1'}])
+def test_unsupported_attribute_values_raise_type_error(value):
+    with pytest.raises(TypeError):
+        deserialize(value)
+    with pytest.raises(TypeError):
+        deserialize_item({'attribute': value})
+
+
+def test_serialize_round_trip():
+    item = {
+        'name': 'x',
+        'count': 3,
+        'ratio': Decimal('0.25'),
+        'flag': True,
+        'missing': None,
+        'blob': b'\x01',
+        'tags': {'a'},
+        'scores': {1, 2},
+        'nested': {'list': [1, 'two', {'three': 3}]},
+    }
+    assert deserialize_item(serialize_item(item)) == item
+
+
+def test_serialize_rejects_unknown_types():
+    with pytest.raises(TypeError):
+        serialize(object())
+
+
+def test_projection_decodes_only_listed_attributes():
+    projection = Projection('phone_no', 'account_status', 'reason')
+    item = {'phone_no': {'N': '2016166576'}, 'account_status': {'S': 'active'}, 'other': {'S': 'x'}}
+    assert projection(item) == {'phone_no': 2016166576, 'account_status': 'active'}
+    assert projection.read_kwargs() == {
+        'ProjectionExpression': '#p0, #p1, #p2',
+        'ExpressionAttributeNames': {'#p0': 'phone_no', '#p1': 'account_status', '#p2': 'reason'},
+    }
+
+
+def test_projection_can_keep_number_strings():
+    projection = Projection('phone_no', 'account_balance', 'tags', numbers_as_strings=True)
+    item = {'phone_no': {'N': '2016166576'}, 'account_balance': {'N': '120'}, 'tags': {'SS': ['a']}}
+    assert projection(item) == {'phone_no': '2016166576', 'account_balance': '120', 'tags': {'a'}}
+
+
+def test_json_default():
+    assert json_default(Decimal('2500.75')) == '2500.75'
+    assert json_default({'b', 'a'}) == ['a', 'b']
+    assert json_default(b'\x00\x01') == 'AAE='
+    with pytest.raises(TypeError):
+        json_default(object())
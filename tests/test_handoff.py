@@ -0,0 +1,89 @@
+from datetime import datetime, timezone
+
+import pytest
+
+from eazybank_common import handoff, payload
+from eazybank_common.dynamodb import deserialize_item
+from fake_aws import CallRecorder, FakeDynamoDB
+
+TABLE = 'eazybank-human-agent-requests'
+
+
+def test_dedup_key_is_deterministic():
+    key = handoff.dedup_key('session-1', '2024-06-10T10:00:00Z')
+    assert key == handoff.dedup_key('session-1', '2024-06-10T10:00:00Z')
+    assert len(key) == 64 and int(key, 16) >= 0
+    assert key != handoff.dedup_key('session-1', '2024-06-10T10:00:01Z')
+    assert key != handoff.dedup_key('session-2', '2024-06-10T10:00:00Z')
+
+
+@pytest.mark.parametrize('timestamp', [
+    '2024-06-10T10:00:00Z',
+    '2024-06-10T10:00:00+00:00',
+    '2024-06-10T12:00:00+02:00',
+    '2024-06-10T10:00:00',
+    '1718013600',
+    1718013600,
+    1718013600000,
+    '1718013600000',
+])
+def test_requested_at_ms(timestamp):
+    assert handoff.requested_at_ms(timestamp) == 1718013600000
+
+
+@pytest.mark.parametrize('timestamp', [None, '', 'tomorrow-ish', 'nan', 'inf', '-1', '1e20'])
+def test_requested_at_ms_rejects_invalid_timestamps(timestamp):
+    with pytest.raises(ValueError):
+        handoff.requested_at_ms(timestamp)
+
+
+def test_to_iso():
+    assert handoff.to_iso(1718013600000) == '2024-06-10T10:00:00.000+00:00'
+    assert datetime.fromisoformat(handoff.to_iso('1718013600123')) == datetime(
+        2024, 6, 10, 10, 0, 0, 123000, tzinfo=timezone.utc)
+
+
+def test_build_item():
+    message = handoff.build_message('Connect me to a human', 'User: Hi', 'session-1', '2024-06-10T10:00:00Z')
+    fields = deserialize_item(handoff.build_item(message))
+    assert fields['session_id'] == 'session-1'
+    assert fields['requested_at'] == 1718013600000
+    assert fields['status'] == handoff.STATUS_OPEN and fields['open_queue'] == handoff.OPEN_QUEUE
+    assert fields['history_preview'] == 'User: Hi'
+    assert handoff.read_history(fields) == 'User: Hi'
+
+
+def test_build_item_uses_the_fallback_only_for_invalid_timestamps():
+    message = {'session_id': 'session-1', 'timestamp': 'tomorrow-ish'}
+    with pytest.raises(ValueError):
+        handoff.build_item(message)
+    assert handoff.build_item(message, fallback_requested_at='1718013600000')['requested_at'] == {'N': '1718013600000'}
+    message['timestamp'] = '2024-06-10T10:00:00Z'
+    assert handoff.build_item(message, fallback_requested_at=1)['requested_at'] == {'N': '1718013600000'}
+
+
+def test_build_item_requires_a_session_id():
+    with pytest.raises(ValueError):
+        handoff.build_item({'timestamp': '2024-06-10T10:00:00Z'})
+
+
+def test_large_histories_go_to_the_claim_check_store(tmp_path, monkeypatch):
+    monkeypatch.setattr(payload, 'INLINE_MAX_BYTES', 64)
+    monkeypatch.setattr(payload, '_store', payload.LocalFileStore(str(tmp_path)))
+    history = ''.join(f'User: question {index}\nAgent: answer {index}\n' for index in range(200))
+
+    message = handoff.build_message('Help', history, 'session-1', '2024-06-10T10:00:00Z')
+    assert 'history' not in message
+    assert message['history_ref'].startswith('file://')
+    assert handoff.read_history(deserialize_item(handoff.build_item(message))) == history
+
+
+def test_put_item_writes_each_request_once():
+    client = FakeDynamoDB(CallRecorder(), {TABLE: ('session_id', 'requested_at')})
+    first = handoff.build_item({'session_id': 'session-1', 'timestamp': '2024-06-10T10:00:00Z'})
+    second = handoff.build_item({'session_id': 'session-1', 'timestamp': '2024-06-10T10:05:00Z'})
+
+    assert handoff.put_item(client, TABLE, first)
+    assert not handoff.put_item(client, TABLE, first)
+    assert handoff.put_item(client, TABLE, second)
+    assert [record['eventName'] for record in client.drain_stream(TABLE)] == ['INSERT', 'INSERT']
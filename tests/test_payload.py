@@ -0,0 +1,67 @@
+import pytest
+
+from eazybank_common import payload
+
+HISTORY = ''.join(f'User: question {index}\nAgent: answer {index}\n' for index in range(100))
+
+
+@pytest.mark.parametrize('codec', [payload.CODEC_NONE, payload.CODEC_ZLIB])
+def test_encode_round_trip(codec):
+    blob = payload.encode(HISTORY, codec)
+    assert blob[:2] == payload.MAGIC
+    assert payload.decode(blob) == HISTORY
+    assert payload.decode(payload.from_text(payload.to_text(blob))) == HISTORY
+
+
+def test_large_text_is_compressed_and_small_text_is_not():
+    assert payload.encode(HISTORY, payload.CODEC_ZLIB)[3] == payload.CODEC_ZLIB
+    assert len(payload.encode(HISTORY, payload.CODEC_ZLIB)) < len(HISTORY)
+    assert payload.encode('Hi', payload.CODEC_ZLIB)[3] == payload.CODEC_NONE
+
+
+def test_decode_passes_through_plain_values():
+    assert payload.decode(None) is None
+    assert payload.decode('plain text') == 'plain text'
+    assert payload.decode(b'headerless') == 'headerless'
+
+
+def test_decode_rejects_unknown_formats():
+    with pytest.raises(ValueError):
+        payload.decode(payload.MAGIC + bytes((payload.FORMAT_VERSION + 1, payload.CODEC_NONE)) + b'x')
+    with pytest.raises(ValueError):
+        payload.decode(payload.MAGIC + bytes((payload.FORMAT_VERSION, 99)) + b'x')
+
+
+def test_preview_keeps_the_most_recent_part():
+    assert payload.preview('short', 10) == 'short'
+    assert payload.preview('0123456789abc', 3) == payload.TRUNCATION_MARKER + 'abc'
+
+
+def test_truncate_fits_the_budget_and_keeps_the_end():
+    text = ''.join(f'{index:08d}' for index in range(20000))  # Does not compress well
+    blob = payload.truncate(text, 4096)
+    assert len(blob) <= 4096
+    decoded = payload.decode(blob)
+    assert decoded.startswith(payload.TRUNCATION_MARKER)
+    assert text.endswith(decoded[len(payload.TRUNCATION_MARKER):])
+
+
+def test_local_file_store_round_trip(tmp_path):
+    store = payload.store_for(f'file://{tmp_path}')
+    assert isinstance(store, payload.LocalFileStore)
+    ref = store.put('handoff/abc', b'blob')
+    assert ref.startswith('file://')
+    assert store.get(ref) == b'blob'
+    assert payload.fetch(ref) == b'blob'
+
+
+def test_store_for_s3_and_unknown_urls():
+    store = payload.store_for('s3://bucket/prefix/')
+    assert (store.bucket, store.prefix) == ('bucket', 'prefix')
+    with pytest.raises(ValueError):
+        payload.store_for('ftp://host/path')
+
+
+def test_claim_check_store_is_abstract():
+    with pytest.raises(TypeError):
+        payload.ClaimCheckStore()
@@ -0,0 +1,66 @@
+import pytest
+
+from eazybank_common import phone
+from eazybank_common.bloom import BloomFilter
+
+
+@pytest.fixture(autouse=True)
+def no_filter():
+    phone.set_filter(None)
+    yield
+    phone.set_filter(None)
+
+
+@pytest.mark.parametrize('value', [
+    '2016166576',
+    2016166576,
+    '(201) 616-6576',
+    '201.616.6576',
+    '+1 201 616 6576',
+    '1-201-616-6576',
+    ' 201 616 6576 ',
+])
+def test_normalize(value):
+    assert phone.normalize(value) == '2016166576'
+
+
+@pytest.mark.parametrize('value', [None, '', '12345', '0016166576', '201616657a', '+44 20 7946 0958', '20161665761'])
+def test_normalize_rejects_invalid_numbers(value):
+    with pytest.raises(phone.InvalidPhoneNumber):
+        phone.normalize(value)
+
+
+def test_every_number_might_exist_without_a_filter():
+    assert phone.might_exist('2016166576')
+
+
+def test_filter_rules_out_unknown_numbers():
+    bloom_filter = BloomFilter.for_capacity(10, 0.0001)
+    bloom_filter.add('2016166576')
+    phone.set_filter(bloom_filter)
+    assert phone.might_exist('2016166576')
+    assert not phone.might_exist('2016166999')
+
+
+def test_stale_filter_is_ignored(monkeypatch):
+    bloom_filter = BloomFilter.for_capacity(10, 0.0001)
+    bloom_filter.built_at -= 3600
+    phone.set_filter(bloom_filter)
+    monkeypatch.setattr(phone, 'FILTER_MAX_AGE_SECONDS', 60)
+    assert phone.get_filter() is None
+    assert phone.might_exist('2016166999')
+
+
+def test_load_filter_from_file(tmp_path):
+    bloom_filter = BloomFilter.for_capacity(10, 0.0001)
+    bloom_filter.add('2016166576')
+    path = tmp_path / 'phone_filter.bin'
+    path.write_bytes(bloom_filter.to_bytes())
+    assert '2016166576' in phone.load_filter(str(path))
+    assert '2016166576' in phone.load_filter(f'file://{path}')
+
+
+def test_failed_load_keeps_the_previous_filter(tmp_path):
+    bloom_filter = BloomFilter.for_capacity(10, 0.0001)
+    phone.set_filter(bloom_filter)
+    assert phone.load_filter(str(tmp_path / 'missing.bin')) is bloom_filter
@@ -0,0 +1,81 @@
+import json
+import time
+
+import pytest
+
+from eazybank_common import session_digest
+from eazybank_common.session_digest import ATTRIBUTE, VERSION, SessionDigest
+
+STATUS = {'phone_no': '2016166576', 'user_name': 'Test User', 'account_status': 'rejected', 'reason': 'x'}
+
+
+def attributes(data):
+    return {ATTRIBUTE: json.dumps(data)}
+
+
+def test_round_trip_through_session_attributes():
+    digest = SessionDigest.load({})
+    assert digest.get_lookup('2016166576') == (False, None)
+    digest.put_lookup('2016166576', STATUS)
+    digest.put_lookup('2016166599', None)
+    digest.mark_handoff('2024-06-10T10:00:00Z')
+    session_attributes = digest.apply({'other': 'kept'})
+
+    loaded = SessionDigest.load(session_attributes)
+    assert session_attributes['other'] == 'kept'
+    assert loaded.get_lookup('2016166576') == (True, STATUS)
+    assert loaded.get_lookup('2016166599') == (True, None)
+    assert loaded.handoff_queued() == '2024-06-10T10:00:00Z'
+    assert not loaded.changed
+
+
+def test_unchanged_digest_returns_the_same_attributes():
+    session_attributes = {'other': 'kept'}
+    assert SessionDigest.load(session_attributes).apply(session_attributes) is session_attributes
+
+
+def test_expired_entries_are_dropped():
+    old = int(time.time()) - 10 ** 6
+    digest = SessionDigest.load(attributes({'v': VERSION, 'l': {'2016166576': [old, STATUS]}, 'h': [old, 'ts']}))
+    assert digest.get_lookup('2016166576') == (False, None)
+    assert digest.handoff_queued() is None
+    assert ATTRIBUTE not in digest.apply(attributes({}))
+
+
+@pytest.mark.parametrize('raw', [
+    'not json',
+    '[]',
+    json.dumps({'v': VERSION - 1, 'l': {}}),
+    json.dumps({'v': VERSION, 'l': []}),
+    json.dumps({'v': VERSION, 'l': {'2016166576': ['x', None]}}),
+    json.dumps({'v': VERSION, 'l': {'2016166576': [1]}}),
+    json.dumps({'v': VERSION, 'h': 'abc'}),
+    json.dumps({'v': VERSION, 'h': [True, 'ts']}),
+    '{"v": 2, "l": {"2016166576": [NaN, null]}}',
+])
+def test_unusable_digests_are_discarded(raw):
+    digest = SessionDigest.load({ATTRIBUTE: raw, 'other': 'kept'})
+    assert digest.lookups == {} and digest.handoff is None
+    assert digest.apply({ATTRIBUTE: raw, 'other': 'kept'}) == {'other': 'kept'}
+
+
+def test_least_recently_used_lookups_are_dropped_to_fit(monkeypatch):
+    monkeypatch.setattr(session_digest, 'MAX_BYTES', 200)
+    digest = SessionDigest()
+    for index in range(10):
+        digest.put_lookup(f'20161665{index:02d}', {'account_status': 'active'})
+    digest.get_lookup('2016166500')  # Most recently used now
+
+    raw = digest.apply({})[ATTRIBUTE]
+    assert len(raw.encode('utf-8')) <= 200
+    loaded = SessionDigest.load({ATTRIBUTE: raw})
+    assert loaded.get_lookup('2016166500')[0]
+    assert not loaded.get_lookup('2016166501')[0]
+
+
+def test_zero_max_bytes_disables_the_digest(monkeypatch):
+    monkeypatch.setattr(session_digest, 'MAX_BYTES', 0)
+    digest = SessionDigest.load(attributes({'v': VERSION, 'l': {'2016166576': [int(time.time()), STATUS]}}))
+    assert digest.get_lookup('2016166576') == (False, None)
+    digest.put_lookup('2016166576', STATUS)
+    assert digest.apply({}) == {}